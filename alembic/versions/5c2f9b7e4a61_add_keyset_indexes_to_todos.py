@@ -0,0 +1,35 @@
+"""Add keyset pagination indexes to todos
+
+Revision ID: 5c2f9b7e4a61
+Revises: 13fcf33e3197
+Create Date: 2026-10-18 09:12:41.512307
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5c2f9b7e4a61"
+down_revision: Union[str, None] = "13fcf33e3197"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_todos_owner_id_id", "todos", ["owner_id", "id"], if_not_exists=True
+    )
+    op.create_index(
+        "ix_todos_owner_id_priority_id",
+        "todos",
+        ["owner_id", "priority", "id"],
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_todos_owner_id_priority_id", table_name="todos")
+    op.drop_index("ix_todos_owner_id_id", table_name="todos")
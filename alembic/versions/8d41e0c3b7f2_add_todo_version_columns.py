@@ -0,0 +1,46 @@
+"""Add version counters for todo ETags
+
+Revision ID: 8d41e0c3b7f2
+Revises: 5c2f9b7e4a61
+Create Date: 2026-10-18 10:03:27.184930
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8d41e0c3b7f2"
+down_revision: Union[str, None] = "5c2f9b7e4a61"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Databases created by the app (create_all) already have the columns.
+    inspector = sa.inspect(op.get_bind())
+    todo_columns = {col["name"] for col in inspector.get_columns("todos")}
+    user_columns = {col["name"] for col in inspector.get_columns("users")}
+
+    if "version" not in todo_columns:
+        op.add_column(
+            "todos",
+            sa.Column("version", sa.Integer(), nullable=False, server_default="1"),
+        )
+    if "todo_list_version" not in user_columns:
+        op.add_column(
+            "users",
+            sa.Column(
+                "todo_list_version", sa.Integer(), nullable=False, server_default="0"
+            ),
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("todo_list_version")
+    with op.batch_alter_table("todos") as batch_op:
+        batch_op.drop_column("version")
@@ -0,0 +1,57 @@
+"""Create refresh tokens table
+
+Revision ID: a3e7c15d90b4
+Revises: 8d41e0c3b7f2
+Create Date: 2026-10-18 11:26:05.731842
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a3e7c15d90b4"
+down_revision: Union[str, None] = "8d41e0c3b7f2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "refresh_tokens",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("jti", sa.String(), nullable=False),
+        sa.Column("family_id", sa.String(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("revoked", sa.Boolean(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        if_not_exists=True,
+    )
+    op.create_index(
+        "ix_refresh_tokens_id", "refresh_tokens", ["id"], if_not_exists=True
+    )
+    op.create_index(
+        "ix_refresh_tokens_jti",
+        "refresh_tokens",
+        ["jti"],
+        unique=True,
+        if_not_exists=True,
+    )
+    op.create_index(
+        "ix_refresh_tokens_family_id",
+        "refresh_tokens",
+        ["family_id"],
+        if_not_exists=True,
+    )
+    op.create_index(
+        "ix_refresh_tokens_user_id", "refresh_tokens", ["user_id"], if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("refresh_tokens")
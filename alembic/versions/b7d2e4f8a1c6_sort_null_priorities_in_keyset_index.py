@@ -0,0 +1,37 @@
+"""Sort NULL priorities in the keyset pagination index
+
+Revision ID: b7d2e4f8a1c6
+Revises: e6d1a9f3c2b8
+Create Date: 2026-10-18 16:40:12.338201
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b7d2e4f8a1c6"
+down_revision: Union[str, None] = "e6d1a9f3c2b8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Listings sort by coalesce(priority, 0) so todos without a priority are
+    # not skipped by keyset comparisons; index that expression instead.
+    op.drop_index("ix_todos_owner_id_priority_id", table_name="todos")
+    op.create_index(
+        "ix_todos_owner_id_priority_id",
+        "todos",
+        ["owner_id", sa.text("coalesce(priority, 0)"), "id"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_todos_owner_id_priority_id", table_name="todos")
+    op.create_index(
+        "ix_todos_owner_id_priority_id", "todos", ["owner_id", "priority", "id"]
+    )
@@ -0,0 +1,110 @@
+"""Add full-text search over todo titles and descriptions
+
+Revision ID: e6d1a9f3c2b8
+Revises: a3e7c15d90b4
+Create Date: 2026-10-18 14:02:51.906214
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e6d1a9f3c2b8"
+down_revision: Union[str, None] = "a3e7c15d90b4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+POSTGRES_SEARCH_VECTOR = """
+    setweight(to_tsvector('english', coalesce({row}title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce({row}description, '')), 'B')
+"""
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        # btree_gin lets owner_id share the GIN index with the tsvector.
+        op.execute("CREATE EXTENSION IF NOT EXISTS btree_gin")
+        op.execute("ALTER TABLE todos ADD COLUMN IF NOT EXISTS search_vector tsvector")
+        op.execute(
+            f"""
+            CREATE OR REPLACE FUNCTION todos_search_vector_update()
+            RETURNS trigger AS $$
+            BEGIN
+                NEW.search_vector := {POSTGRES_SEARCH_VECTOR.format(row="NEW.")};
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+            """
+        )
+        op.execute("DROP TRIGGER IF EXISTS todos_search_vector_update ON todos")
+        op.execute(
+            """
+            CREATE TRIGGER todos_search_vector_update
+            BEFORE INSERT OR UPDATE OF title, description ON todos
+            FOR EACH ROW EXECUTE FUNCTION todos_search_vector_update()
+            """
+        )
+        op.execute(
+            f"UPDATE todos SET search_vector = {POSTGRES_SEARCH_VECTOR.format(row='')}"
+            " WHERE search_vector IS NULL"
+        )
+        op.execute(
+            "CREATE INDEX IF NOT EXISTS ix_todos_owner_id_search_vector"
+            " ON todos USING gin (owner_id, search_vector)"
+        )
+    elif dialect == "sqlite":
+        op.execute(
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS todos_fts USING fts5(
+                title, description,
+                content='todos', content_rowid='id', tokenize='porter unicode61'
+            )
+            """
+        )
+        op.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS todos_fts_insert AFTER INSERT ON todos BEGIN
+                INSERT INTO todos_fts(rowid, title, description)
+                VALUES (new.id, new.title, new.description);
+            END
+            """
+        )
+        op.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS todos_fts_delete AFTER DELETE ON todos BEGIN
+                INSERT INTO todos_fts(todos_fts, rowid, title, description)
+                VALUES ('delete', old.id, old.title, old.description);
+            END
+            """
+        )
+        op.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS todos_fts_update
+            AFTER UPDATE OF title, description ON todos BEGIN
+                INSERT INTO todos_fts(todos_fts, rowid, title, description)
+                VALUES ('delete', old.id, old.title, old.description);
+                INSERT INTO todos_fts(rowid, title, description)
+                VALUES (new.id, new.title, new.description);
+            END
+            """
+        )
+        op.execute("INSERT INTO todos_fts(todos_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_todos_owner_id_search_vector")
+        op.execute("DROP TRIGGER IF EXISTS todos_search_vector_update ON todos")
+        op.execute("DROP FUNCTION IF EXISTS todos_search_vector_update()")
+        op.execute("ALTER TABLE todos DROP COLUMN IF EXISTS search_vector")
+    elif dialect == "sqlite":
+        op.execute("DROP TRIGGER IF EXISTS todos_fts_update")
+        op.execute("DROP TRIGGER IF EXISTS todos_fts_delete")
+        op.execute("DROP TRIGGER IF EXISTS todos_fts_insert")
+        op.execute("DROP TABLE IF EXISTS todos_fts")
@@ -0,0 +1,172 @@
+"""Static asset pipeline and the handler that serves its output.
+
+``python -m assets`` copies every file under ``static/`` to ``build/static/``
+with a content hash in its name (``css/bootstrap.3f2a9c1d0b7e.css``), writes
+gzip and, when the optional ``brotli`` package is installed, brotli variants
+next to it, and records the mapping in ``manifest.json``. Templates link
+assets through ``static_url()``, which points at the hashed copy when the
+manifest lists it and at the plain ``/static`` mount otherwise, so a
+missing build only costs caching.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+from functools import cache
+
+import orjson
+from jinja2 import pass_context
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.staticfiles import StaticFiles
+
+from compression import accepted_encodings
+
+SOURCE_DIR = "static"
+BUILD_DIR = os.path.join("build", "static")
+MANIFEST_NAME = "manifest.json"
+
+HASH_LENGTH = 12
+COMPRESSIBLE_SUFFIXES = frozenset({".css", ".js", ".map", ".svg", ".json", ".txt", ".html"})
+
+SOURCE_MAP_URL = re.compile(rb"([/*#@]\s*sourceMappingURL=)([^\s*]+)")
+
+# Hashed names change whenever the content does, so they can be cached forever.
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+def brotli_module():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def compressed_variants(data: bytes):
+    """``(suffix, bytes)`` for each encoding that makes ``data`` smaller."""
+    variants = [(".gz", gzip.compress(data, compresslevel=9, mtime=0))]
+    brotli = brotli_module()
+    if brotli is not None:
+        variants.append((".br", brotli.compress(data, quality=11)))
+    return [(suffix, body) for suffix, body in variants if len(body) < len(data)]
+
+
+def hashed_name(path: str, data: bytes) -> str:
+    root, ext = os.path.splitext(path)
+    return f"{root}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}{ext}"
+
+
+def rewrite_source_map_url(path: str, data: bytes, manifest: dict[str, str]) -> bytes:
+    """Point a ``sourceMappingURL`` comment at the map's hashed name."""
+
+    def replace(match):
+        directory = posixpath.dirname(path)
+        target = manifest.get(posixpath.normpath(posixpath.join(directory, match[2].decode())))
+        if target is None:
+            return match[0]
+        return match[1] + posixpath.relpath(target, directory or ".").encode()
+
+    return SOURCE_MAP_URL.sub(replace, data)
+
+
+def build_assets(source: str = SOURCE_DIR, output: str = BUILD_DIR) -> dict[str, str]:
+    """Build fingerprinted, precompressed copies of ``source`` in ``output``.
+
+    ``output`` is rebuilt from scratch; returns the manifest. Source maps are
+    built first so the files referencing them can be rewritten to the hashed
+    names before being hashed themselves.
+    """
+    shutil.rmtree(output, ignore_errors=True)
+    paths = []
+    for directory, _, files in os.walk(source):
+        for filename in files:
+            source_path = os.path.join(directory, filename)
+            paths.append(os.path.relpath(source_path, source).replace(os.sep, "/"))
+    paths.sort(key=lambda path: (not path.endswith(".map"), path))
+
+    manifest = {}
+    for path in paths:
+        with open(os.path.join(source, path), "rb") as f:
+            data = rewrite_source_map_url(path, f.read(), manifest)
+
+        target = hashed_name(path, data)
+        target_path = os.path.join(output, target)
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        with open(target_path, "wb") as f:
+            f.write(data)
+        if os.path.splitext(path)[1] in COMPRESSIBLE_SUFFIXES:
+            for suffix, body in compressed_variants(data):
+                with open(target_path + suffix, "wb") as f:
+                    f.write(body)
+        manifest[path] = target
+
+    with open(os.path.join(output, MANIFEST_NAME), "wb") as f:
+        f.write(orjson.dumps(manifest, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS))
+    return manifest
+
+
+@cache
+def load_manifest(output: str = BUILD_DIR) -> dict[str, str]:
+    try:
+        with open(os.path.join(output, MANIFEST_NAME), "rb") as f:
+            return orjson.loads(f.read())
+    except FileNotFoundError:
+        return {}
+
+
+@pass_context
+def static_url(context, path: str):
+    """Jinja global: URL of static file ``path`` (e.g. ``css/base.css``)."""
+    request = context["request"]
+    path = path.lstrip("/")
+    hashed = load_manifest().get(path)
+    if hashed is None:
+        return request.url_for("static", path=path)
+    return request.url_for("assets", path=hashed)
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles that serves a ``.br`` or ``.gz`` sibling of the requested
+    file when the client accepts that encoding, and marks every response
+    with ``cache_control``."""
+
+    ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+    def __init__(self, *args, cache_control: str = IMMUTABLE, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache_control = cache_control
+
+    async def get_response(self, path, scope):
+        accepted = accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+        for encoding, suffix in self.ENCODINGS:
+            if encoding not in accepted and "*" not in accepted:
+                continue
+            try:
+                response = await super().get_response(path + suffix, scope)
+            except HTTPException:
+                continue
+            if response.status_code in (200, 206, 304):
+                media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+                if media_type.startswith("text/"):
+                    media_type += "; charset=utf-8"
+                response.headers["content-type"] = media_type
+                response.headers["content-encoding"] = encoding
+                return self.finish(response)
+
+        return self.finish(await super().get_response(path, scope))
+
+    def finish(self, response):
+        if response.status_code < 400:
+            response.headers["cache-control"] = self.cache_control
+            response.headers["vary"] = "Accept-Encoding"
+        return response
+
+
+if __name__ == "__main__":
+    built = build_assets()
+    print(f"Built {len(built)} assets into {BUILD_DIR}")
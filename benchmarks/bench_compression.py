@@ -0,0 +1,61 @@
+"""Compression ratio and CPU cost per encoding and level for a todo list.
+
+Usage: python -m benchmarks.bench_compression
+
+Encodings whose optional package (brotli, zstandard) is not installed are
+skipped.
+"""
+
+import time
+
+import orjson
+
+from compression import BrotliEncoder, GzipEncoder, ZstdEncoder
+
+ROUNDS = 200
+LEVELS = {
+    "gzip": (GzipEncoder, (1, 5, 9)),
+    "br": (BrotliEncoder, (1, 4, 11)),
+    "zstd": (ZstdEncoder, (1, 3, 9)),
+}
+
+
+def make_body(count: int) -> bytes:
+    return orjson.dumps(
+        [
+            {
+                "id": i,
+                "title": f"Todo number {i}",
+                "description": "Something that needs to be done",
+                "priority": i % 5 + 1,
+                "complete": i % 3 == 0,
+                "owner_id": 1,
+            }
+            for i in range(count)
+        ]
+    )
+
+
+def main():
+    for count in (50, 500):
+        body = make_body(count)
+        print(f"{count} todos, {len(body)} bytes")
+        for encoding, (encoder, levels) in LEVELS.items():
+            for level in levels:
+                try:
+                    encoder(level)
+                except ImportError:
+                    print(f"  {encoding:<5} not installed")
+                    break
+                start = time.thread_time()
+                for _ in range(ROUNDS):
+                    compressed = encoder(level).finish(body)
+                per_response = (time.thread_time() - start) / ROUNDS * 1e6
+                print(
+                    f"  {encoding:<5} level {level:<2} {len(compressed):7d} bytes "
+                    f"({len(compressed) / len(body):5.1%})  {per_response:8.1f} us"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Per-request overhead of the monitoring middleware.
+
+Usage: python -m benchmarks.bench_middleware
+
+Requests are driven straight through the ASGI interface, so the numbers
+are middleware cost only, with no server or network in the way. The
+BaseHTTPMiddleware variant mirrors the previous implementation.
+"""
+
+import asyncio
+import logging
+import os
+import time
+
+from starlette.applications import Starlette
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from monitoring import REQUEST_COUNT, REQUEST_LATENCY, MonitoringMiddleware
+
+REQUESTS = 20_000
+
+
+async def todo(request):
+    return PlainTextResponse("ok")
+
+
+def make_app(middleware=None):
+    app = Starlette(routes=[Route("/todos/todo/{todo_id}", todo)])
+    if middleware is not None:
+        app.add_middleware(*middleware)
+    return app
+
+
+class BaseHTTPMonitoring(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        start_time = time.time()
+        response = await call_next(request)
+        process_time = time.time() - start_time
+        REQUEST_COUNT.labels(
+            method=request.method,
+            endpoint=request.url.path,
+            status_code=response.status_code,
+        ).inc()
+        REQUEST_LATENCY.labels(
+            method=request.method, endpoint=request.url.path
+        ).observe(process_time)
+        return response
+
+
+async def drive(app, count: int) -> float:
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for i in range(count):
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": f"/todos/todo/{i % 100}",
+            "raw_path": f"/todos/todo/{i % 100}".encode(),
+            "root_path": "",
+            "query_string": b"",
+            "headers": [],
+            "server": ("testserver", 80),
+            "client": ("127.0.0.1", 1234),
+        }
+        await app(scope, receive, send)
+    return time.perf_counter() - start
+
+
+async def main():
+    # Keep the cost of formatting and writing sampled log lines, not the noise.
+    logging.getLogger().handlers = [logging.StreamHandler(open(os.devnull, "w"))]
+    apps = {
+        "no middleware": make_app(),
+        "BaseHTTPMiddleware": make_app((BaseHTTPMonitoring,)),
+        "pure ASGI, logging off": make_app((MonitoringMiddleware, 0.0)),
+        "pure ASGI, 1% log sampling": make_app((MonitoringMiddleware, 0.01)),
+    }
+    baseline = None
+    for label, app in apps.items():
+        await drive(app, 1_000)
+        elapsed = await drive(app, REQUESTS)
+        per_request = elapsed / REQUESTS * 1e6
+        if baseline is None:
+            baseline = per_request
+        print(
+            f"{label:<28} {per_request:7.1f} us/request "
+            f"(+{per_request - baseline:6.1f} us)"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
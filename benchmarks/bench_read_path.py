@@ -0,0 +1,96 @@
+"""Todo list reads: ORM entities vs the Core column path in queries.py.
+
+Usage: python -m benchmarks.bench_read_path
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from database import Base
+from models import Todos, Users
+from queries import fetch_rows, rows_to_dicts, select_todos
+
+TODO_FIELDS = ("id", "title", "description", "priority", "complete", "owner_id")
+
+
+async def seed(engine, count: int):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(
+            insert(Users).values(
+                id=1,
+                email="bench@example.com",
+                username="bench",
+                first_name="Bench",
+                last_name="User",
+                hashed_password="x",
+                is_active=True,
+                role="user",
+                phone_number="000",
+            )
+        )
+        await conn.execute(
+            insert(Todos),
+            [
+                {
+                    "title": f"Todo {i}",
+                    "description": "Benchmark description",
+                    "priority": i % 5 + 1,
+                    "complete": i % 2 == 0,
+                    "owner_id": 1,
+                }
+                for i in range(count)
+            ],
+        )
+
+
+async def orm_read(session):
+    todos = (await session.scalars(select(Todos).order_by(Todos.id))).all()
+    return [{field: getattr(todo, field) for field in TODO_FIELDS} for todo in todos]
+
+
+async def core_read(session):
+    return rows_to_dicts(await fetch_rows(session, select_todos().order_by(Todos.id)))
+
+
+async def measure(engine, read, repeat: int = 5):
+    best = float("inf")
+    for _ in range(repeat):
+        async with AsyncSession(engine) as session:
+            start = time.perf_counter()
+            await read(session)
+            best = min(best, time.perf_counter() - start)
+    async with AsyncSession(engine) as session:
+        tracemalloc.start()
+        await read(session)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return best, peak
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in (1_000, 10_000, 50_000):
+            path = os.path.join(tmp, f"bench-{count}.db")
+            engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+            await seed(engine, count)
+            orm_time, orm_peak = await measure(engine, orm_read)
+            core_time, core_peak = await measure(engine, core_read)
+            print(
+                f"{count:>6} rows: ORM {orm_time * 1e3:8.2f} ms "
+                f"{orm_peak / 2**20:7.2f} MiB | "
+                f"Core {core_time * 1e3:8.2f} ms {core_peak / 2**20:7.2f} MiB | "
+                f"{orm_time / core_time:4.1f}x faster, "
+                f"{orm_peak / core_peak:4.1f}x less memory"
+            )
+            await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
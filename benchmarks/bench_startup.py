@@ -0,0 +1,81 @@
+"""Worker start-up cost: cold import, schema init and fork-after-preload.
+
+Usage: python -m benchmarks.bench_startup
+
+Each measurement runs in a fresh interpreter against a throwaway SQLite
+database, so module caches from this process do not skew the numbers.
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+RUNS = 5
+
+COLD_IMPORT = """
+import time
+start = time.perf_counter()
+import main
+print(time.perf_counter() - start)
+"""
+
+SCHEMA_INIT = """
+import time
+import database
+start = time.perf_counter()
+database.init_db()
+print(time.perf_counter() - start)
+"""
+
+FORK_AFTER_PRELOAD = """
+import gc, os, time
+from fastapi.testclient import TestClient
+import main
+from database import init_db
+init_db()
+gc.freeze()
+start = time.perf_counter()
+pid = os.fork()
+if pid == 0:
+    with TestClient(main.app) as client:
+        client.get("/health")
+    os._exit(0)
+os.waitpid(pid, 0)
+print(time.perf_counter() - start)
+"""
+
+
+def run(code: str, env: dict) -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def measure(label: str, code: str, env: dict):
+    samples = [run(code, env) for _ in range(RUNS)]
+    print(
+        f"{label:<36} median {statistics.median(samples) * 1e3:8.1f} ms | "
+        f"min {min(samples) * 1e3:8.1f} ms"
+    )
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{os.path.join(tmp, 'startup.db')}",
+        }
+        measure("cold import of main (per worker)", COLD_IMPORT, env)
+        measure("schema init (once per preload)", SCHEMA_INIT, env)
+        measure("fork + lifespan after preload", FORK_AFTER_PRELOAD, env)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Time to first byte and total render time of the todo list page.
+
+Usage: python -m benchmarks.bench_todo_page
+
+"miss, full render" renders every row and the whole page before anything is
+sent, as the handler did before streaming. "miss, streamed" is the handler
+on a cache miss: the rows render while the page streams. "hit, streamed"
+streams the page around the cached rows fragment. Compare the two miss
+lines for what streaming buys; the hit line shows what the cache adds.
+"""
+
+import time
+
+from starlette.requests import Request
+
+from main import app
+from rendering import StreamedFragment, join_chunks, render_fragment, templates
+
+ROUNDS = 50
+
+
+def make_request():
+    return Request(
+        {
+            "type": "http",
+            "app": app,
+            "router": app.router,
+            "method": "GET",
+            "scheme": "http",
+            "server": ("testserver", 80),
+            "root_path": "",
+            "path": "/todos/todo-page",
+            "query_string": b"",
+            "headers": [],
+        }
+    )
+
+
+def make_todos(count: int):
+    return [
+        {
+            "id": i,
+            "title": f"Todo number {i}",
+            "description": "Something to do",
+            "priority": i % 5 + 1,
+            "complete": i % 3 == 0,
+            "owner_id": 1,
+        }
+        for i in range(count)
+    ]
+
+
+def timed(render) -> tuple[float, float]:
+    start = time.perf_counter()
+    chunks = render()
+    next(chunks)
+    first = time.perf_counter() - start
+    for _ in chunks:
+        pass
+    return first, time.perf_counter() - start
+
+
+def main():
+    page = templates.get_template("todo.html")
+    context = {"request": make_request(), "user": {"id": 1}}
+
+    for count in (10, 100, 1_000, 10_000):
+        todos = make_todos(count)
+        cached_rows = render_fragment("todo-rows.html", todos=todos)
+
+        def full_render():
+            rows = render_fragment("todo-rows.html", todos=todos)
+            return iter([page.render(context, rows=[rows])])
+
+        def streamed_miss():
+            rows = StreamedFragment("todo-rows.html", todos=todos)
+            return join_chunks(page.generate(context, rows=rows))
+
+        def streamed_hit():
+            return join_chunks(page.generate(context, rows=[cached_rows]))
+
+        for label, render in (
+            ("miss, full render", full_render),
+            ("miss, streamed", streamed_miss),
+            ("hit, streamed", streamed_hit),
+        ):
+            results = [timed(render) for _ in range(ROUNDS)]
+            first = min(r[0] for r in results) * 1e3
+            total = min(r[1] for r in results) * 1e3
+            print(
+                f"{count:>6} todos  {label:<22} first chunk {first:7.2f} ms"
+                f"  total {total:7.2f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
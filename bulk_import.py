@@ -0,0 +1,198 @@
+import codecs
+import csv
+import json
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+
+from models import Todos
+
+IMPORT_CHUNK_SIZE = 1000
+MAX_LINE_LENGTH = 64 * 1024
+MAX_REPORTED_ERRORS = 100
+
+MEDIA_TYPE_FORMATS = {
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "text/csv": "csv",
+}
+
+
+LINE_TOO_LONG = f"Line longer than {MAX_LINE_LENGTH} characters."
+
+
+async def iter_lines(byte_stream):
+    """Decode an async byte stream into lines without buffering the whole body.
+
+    A line longer than MAX_LINE_LENGTH is skipped up to the next newline and
+    yielded as ``None``, so the lines after it are still read.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending = ""
+    skipping = False
+    async for chunk in byte_stream:
+        text = decoder.decode(chunk)
+        if skipping:
+            end = text.find("\n")
+            if end < 0:
+                continue
+            text = text[end + 1 :]
+            skipping = False
+        pending += text
+        lines = pending.split("\n")
+        pending = lines.pop()
+        for line in lines:
+            yield None if len(line) > MAX_LINE_LENGTH else line.rstrip("\r")
+        if len(pending) > MAX_LINE_LENGTH:
+            yield None
+            pending = ""
+            skipping = True
+    pending += decoder.decode(b"", final=True)
+    if pending and not skipping:
+        yield pending.rstrip("\r")
+
+
+async def iter_csv_rows(lines):
+    """Yield ``(line_number, values_or_None, error_or_None)`` per CSV record.
+
+    A quoted field may span lines: a record ends on the first line that
+    leaves its quotes balanced (escaped quotes come in pairs).
+    """
+    record = []
+    record_length = 0
+    first_line = line_number = 0
+    async for line in lines:
+        line_number += 1
+        if line is None:
+            if record:
+                yield first_line, None, LINE_TOO_LONG
+                record.clear()
+            else:
+                yield line_number, None, LINE_TOO_LONG
+            continue
+        if not record:
+            if not line.strip():
+                continue
+            first_line = line_number
+            record_length = 0
+        record.append(line)
+        record_length += len(line) + 1
+        if record_length > MAX_LINE_LENGTH:
+            yield first_line, None, LINE_TOO_LONG
+            record.clear()
+            continue
+        text = "\n".join(record)
+        if text.count('"') % 2:
+            continue
+        record.clear()
+        yield first_line, next(csv.reader([text])), None
+    if record:
+        yield first_line, next(csv.reader(["\n".join(record)])), None
+
+
+async def iter_ndjson_rows(lines):
+    line_number = 0
+    async for line in lines:
+        line_number += 1
+        if line is None:
+            yield line_number, None, LINE_TOO_LONG
+        elif line.strip():
+            yield line_number, line, None
+
+
+async def iter_records(lines, import_format: str):
+    """Yield ``(line_number, record_or_None, error_or_None)`` per data record."""
+    header = None
+    rows = iter_csv_rows(lines) if import_format == "csv" else iter_ndjson_rows(lines)
+    async for line_number, row, error in rows:
+        if error is not None:
+            yield line_number, None, error
+            continue
+        try:
+            if import_format == "csv":
+                if header is None:
+                    # Spreadsheet exports often start with a UTF-8 BOM
+                    header = [name.strip() for name in row]
+                    if header:
+                        header[0] = header[0].lstrip("\ufeff").strip()
+                    continue
+                if len(row) != len(header):
+                    raise ValueError(
+                        f"Expected {len(header)} columns, got {len(row)}."
+                    )
+                record = dict(zip(header, row))
+            else:
+                record = json.loads(row)
+                if not isinstance(record, dict):
+                    raise ValueError("Expected a JSON object.")
+        except ValueError as e:
+            yield line_number, None, str(e)
+            continue
+        yield line_number, record, None
+
+
+async def insert_chunk(db, rows: list[dict]):
+    """Insert a chunk of todo rows with COPY on Postgres, multi-row INSERT
+    everywhere else."""
+    connection = await db.connection()
+    if connection.dialect.driver == "asyncpg":
+        columns = list(rows[0])
+        raw = await connection.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            Todos.__tablename__,
+            records=[tuple(row[column] for column in columns) for row in rows],
+            columns=columns,
+        )
+    else:
+        await db.execute(insert(Todos.__table__).values(rows))
+
+
+async def import_todos(db, byte_stream, import_format: str, owner_id: int, schema):
+    """Validate each line against ``schema`` and insert valid rows in chunks.
+
+    Every chunk is committed as it fills, so memory use is bounded by the
+    chunk size rather than the upload size.
+    """
+    inserted = 0
+    failed = 0
+    errors = []
+    chunk = []
+
+    def record_error(line_number, detail):
+        nonlocal failed
+        failed += 1
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append({"line": line_number, "detail": detail})
+
+    async def flush():
+        nonlocal inserted
+        await insert_chunk(db, chunk)
+        await db.commit()
+        inserted += len(chunk)
+        chunk.clear()
+
+    async for line_number, record, error in iter_records(
+        iter_lines(byte_stream), import_format
+    ):
+        if error is not None:
+            record_error(line_number, error)
+            continue
+        try:
+            todo = schema.model_validate(record)
+        except ValidationError as e:
+            record_error(
+                line_number,
+                "; ".join(
+                    f"{'.'.join(map(str, err['loc']))}: {err['msg']}"
+                    for err in e.errors()
+                ),
+            )
+            continue
+        chunk.append({**todo.model_dump(), "owner_id": owner_id})
+        if len(chunk) >= IMPORT_CHUNK_SIZE:
+            await flush()
+
+    if chunk:
+        await flush()
+
+    return {"inserted": inserted, "failed": failed, "errors": errors}
@@ -0,0 +1,246 @@
+import hashlib
+import itertools
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from prometheus_client import Counter
+
+from config import settings
+
+CACHE_HITS = Counter(
+    "todo_cache_hit_count",
+    "Todo cache lookups served from the cache",
+    ["kind"],
+)
+
+CACHE_MISSES = Counter(
+    "todo_cache_miss_count",
+    "Todo cache lookups that fell through to the database",
+    ["kind"],
+)
+
+CACHE_EVICTIONS = Counter(
+    "todo_cache_eviction_count",
+    "Todo cache entries evicted to stay under the size limit",
+)
+
+class NullBackend:
+    """Backend that never stores anything; used when caching is disabled."""
+
+    async def get(self, key):
+        return None
+
+    async def set(self, key, value, ttl):
+        pass
+
+    async def delete(self, *keys):
+        pass
+
+    async def incr(self, key):
+        return 0
+
+    async def get_counter(self, key):
+        return 0
+
+    async def clear(self):
+        pass
+
+
+class MemoryBackend:
+    """In-process LRU cache with per-entry TTL.
+
+    Only for a single process: another process (e.g. a second gunicorn
+    worker) keeps serving what its own cache holds after a write elsewhere.
+
+    Generation counters live outside the LRU, so they are never evicted
+    while entries keyed by an older generation can still be served. A
+    counter is dropped once it has not changed for the longest entry TTL;
+    counters take their values from one sequence, so a dropped counter that
+    starts again never lands on a generation some stale entry was keyed by.
+    """
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        # key -> (generation, time of the last increment), oldest first
+        self._counters = OrderedDict()
+        self._generations = itertools.count(1)
+        self._max_ttl = 0
+        self._lock = threading.Lock()
+
+    async def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    async def set(self, key, value, ttl):
+        with self._lock:
+            self._max_ttl = max(self._max_ttl, ttl)
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                CACHE_EVICTIONS.inc()
+
+    async def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    async def incr(self, key):
+        with self._lock:
+            now = time.monotonic()
+            generation = next(self._generations)
+            self._counters[key] = (generation, now)
+            self._counters.move_to_end(key)
+            # Every entry keyed by an older generation has expired by now.
+            while self._counters:
+                oldest, (_, changed_at) = next(iter(self._counters.items()))
+                if oldest == key or changed_at + self._max_ttl > now:
+                    break
+                del self._counters[oldest]
+            return generation
+
+    async def get_counter(self, key):
+        with self._lock:
+            return self._counters.get(key, (0, None))[0]
+
+    async def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._counters.clear()
+
+
+class RedisBackend:
+    """Shared backend on top of a ``redis.asyncio`` client.
+
+    Any object with async ``get``/``set``/``delete``/``incr``/``scan_iter``
+    works, which lets tests substitute a local stand-in.
+    """
+
+    def __init__(self, client, prefix="todos:"):
+        self.client = client
+        self.prefix = prefix
+
+    async def get(self, key):
+        raw = await self.client.get(self.prefix + key)
+        return None if raw is None else json.loads(raw)
+
+    async def set(self, key, value, ttl):
+        await self.client.set(self.prefix + key, json.dumps(value), ex=ttl)
+
+    async def delete(self, *keys):
+        if keys:
+            await self.client.delete(*(self.prefix + key for key in keys))
+
+    async def incr(self, key):
+        return await self.client.incr(self.prefix + key)
+
+    async def get_counter(self, key):
+        raw = await self.client.get(self.prefix + key)
+        return int(raw or 0)
+
+    async def clear(self):
+        keys = [key async for key in self.client.scan_iter(match=self.prefix + "*")]
+        if keys:
+            await self.client.delete(*keys)
+
+
+class TodoCache:
+    """Read-through cache for todo lists, single todos and rendered HTML
+    fragments.
+
+    List and fragment entries are keyed by the owner's generation counter, so
+    a write invalidates every cached page for that owner with one increment.
+    """
+
+    def __init__(self, backend, ttl=30):
+        self.backend = backend
+        self.ttl = ttl
+
+    @staticmethod
+    def _item_key(owner_id, todo_id):
+        return f"item:{owner_id}:{todo_id}"
+
+    @staticmethod
+    def _generation_key(owner_id):
+        return f"gen:{owner_id}"
+
+    async def list_key(self, owner_id, variant):
+        """Key of the cached list ``variant`` for the owner's current generation.
+
+        Take it before reading the database and pass the same key to the
+        setter: a write committed in between bumps the generation, so the
+        stale result is stored under a key nobody reads any more.
+        """
+        generation = await self.backend.get_counter(self._generation_key(owner_id))
+        digest = hashlib.sha1(
+            json.dumps(variant, sort_keys=True, default=str).encode()
+        ).hexdigest()
+        return f"list:{owner_id}:{generation}:{digest}"
+
+    async def fragment_key(self, owner_id, name):
+        return await self.list_key(owner_id, {"fragment": name})
+
+    async def _get(self, kind, key):
+        value = await self.backend.get(key)
+        if value is None:
+            CACHE_MISSES.labels(kind=kind).inc()
+        else:
+            CACHE_HITS.labels(kind=kind).inc()
+        return value
+
+    async def get_list(self, key):
+        return await self._get("list", key)
+
+    async def set_list(self, key, value):
+        await self.backend.set(key, value, self.ttl)
+
+    async def get_fragment(self, key):
+        return await self._get("fragment", key)
+
+    async def set_fragment(self, key, html):
+        await self.backend.set(key, str(html), self.ttl)
+
+    async def get_todo(self, owner_id, todo_id):
+        return await self._get("item", self._item_key(owner_id, todo_id))
+
+    async def set_todo(self, owner_id, todo_id, value):
+        await self.backend.set(self._item_key(owner_id, todo_id), value, self.ttl)
+
+    async def invalidate(self, owner_id, *todo_ids):
+        """Drop every cached list for ``owner_id`` and the given todos."""
+        await self.backend.incr(self._generation_key(owner_id))
+        if todo_ids:
+            await self.backend.delete(
+                *(self._item_key(owner_id, todo_id) for todo_id in todo_ids)
+            )
+
+    async def clear(self):
+        await self.backend.clear()
+
+
+def build_backend(backend: str):
+    if backend == "memory":
+        return MemoryBackend(max_entries=settings.TODO_CACHE_MAX_ENTRIES)
+    if backend == "redis":
+        import redis.asyncio as redis
+
+        return RedisBackend(redis.from_url(settings.REDIS_URL))
+    if backend == "none":
+        return NullBackend()
+    raise ValueError(f"Unknown todo cache backend '{backend}'.")
+
+
+todo_cache = TodoCache(
+    build_backend(settings.TODO_CACHE_BACKEND), ttl=settings.TODO_CACHE_TTL_SECONDS
+)
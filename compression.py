@@ -0,0 +1,233 @@
+"""Negotiated response compression (zstd, brotli, gzip).
+
+brotli and zstd need the optional ``brotli`` and ``zstandard`` packages (the
+``compression`` extra); encodings whose package is missing are skipped.
+"""
+
+import time
+import zlib
+
+from prometheus_client import Counter, Histogram
+from starlette.datastructures import Headers, MutableHeaders
+
+from config import settings
+
+COMPRESSION_INPUT_BYTES = Counter(
+    "http_compression_input_bytes",
+    "Response bytes passed to the compressor",
+    ["encoding"],
+)
+
+COMPRESSION_SAVED_BYTES = Counter(
+    "http_compression_saved_bytes",
+    "Response bytes saved by compression",
+    ["encoding"],
+)
+
+COMPRESSION_CPU_SECONDS = Histogram(
+    "http_compression_cpu_seconds",
+    "CPU time spent compressing one response",
+    ["encoding"],
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25),
+)
+
+
+def accepted_encodings(accept_encoding: str) -> set[str]:
+    """Codings the client accepts (``q=0`` excluded), lower-cased."""
+    accepted = set()
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        quality = params.strip()
+        if quality.startswith("q="):
+            try:
+                if float(quality[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.add(coding)
+    return accepted
+
+
+class GzipEncoder:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, data: bytes) -> bytes:
+        # Sync-flush so each streamed chunk can be decoded as it arrives.
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush()
+
+
+class BrotliEncoder:
+    def __init__(self, level: int):
+        import brotli
+
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.process(data) + self._compressor.finish()
+
+
+class ZstdEncoder:
+    def __init__(self, level: int):
+        import zstandard
+
+        self._flush_block = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(self._flush_block)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush()
+
+
+def available_encoders(config=settings) -> dict:
+    """``{encoding: encoder factory}`` in server preference order
+    (COMPRESSION_ENCODINGS), leaving out encodings that cannot be loaded."""
+    encoders = {
+        "gzip": (GzipEncoder, config.COMPRESSION_GZIP_LEVEL, "zlib"),
+        "br": (BrotliEncoder, config.COMPRESSION_BROTLI_LEVEL, "brotli"),
+        "zstd": (ZstdEncoder, config.COMPRESSION_ZSTD_LEVEL, "zstandard"),
+    }
+    available = {}
+    for encoding in filter(None, (e.strip() for e in config.COMPRESSION_ENCODINGS.split(","))):
+        if encoding not in encoders:
+            raise ValueError(f"Unknown compression encoding '{encoding}'.")
+        encoder, level, module = encoders[encoding]
+        try:
+            __import__(module)
+        except ImportError:
+            continue
+        available[encoding] = lambda encoder=encoder, level=level: encoder(level)
+    return available
+
+
+class CompressionMiddleware:
+    """Pure ASGI middleware compressing responses in the best encoding the
+    client accepts.
+
+    Responses are left alone when they are below ``minimum_size``, already
+    encoded, partial, marked ``no-transform`` or of an excluded media type
+    (already-compressed formats and event streams). Streaming responses are
+    compressed chunk by chunk, each chunk flushed so clients see it at once.
+
+    ETags are passed through unchanged: this app's ETags name a todo or list
+    version, which both encodings of a response share.
+    """
+
+    def __init__(self, app, minimum_size: int | None = None, config=settings):
+        self.app = app
+        self.minimum_size = (
+            config.COMPRESSION_MIN_SIZE if minimum_size is None else minimum_size
+        )
+        self.excluded_types = tuple(
+            filter(None, (t.strip() for t in config.COMPRESSION_EXCLUDED_TYPES.split(",")))
+        )
+        self.encoders = available_encoders(config)
+
+    def choose_encoding(self, scope) -> str | None:
+        accepted = accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+        for encoding in self.encoders:
+            if encoding in accepted:
+                return encoding
+        return None
+
+    def compressible(self, headers: Headers) -> bool:
+        if "content-encoding" in headers:
+            return False
+        if "no-transform" in headers.get("cache-control", ""):
+            return False
+        media_type = headers.get("content-type", "").split(";")[0].strip().lower()
+        return not media_type.startswith(self.excluded_types)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = self.choose_encoding(scope)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        encoder = None
+        passthrough = False
+        input_bytes = output_bytes = 0
+        cpu_time = 0.0
+
+        def encode(method, body):
+            nonlocal input_bytes, output_bytes, cpu_time
+            started = time.thread_time()
+            compressed = method(body)
+            cpu_time += time.thread_time() - started
+            input_bytes += len(body)
+            output_bytes += len(compressed)
+            return compressed
+
+        async def send_compressed(message):
+            nonlocal start_message, encoder, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message.get("headers", []))
+                length = headers.get("content-length")
+                if (
+                    message["status"] in (204, 206, 304)
+                    or not self.compressible(headers)
+                    or (length is not None and int(length) < self.minimum_size)
+                ):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = message
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if encoder is None:
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+                encoder = self.encoders[encoding]()
+                headers = MutableHeaders(scope=start_message)
+                headers["content-encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if more_body:
+                    del headers["content-length"]
+                    compressed = encode(encoder.compress, body)
+                else:
+                    compressed = encode(encoder.finish, body)
+                    headers["content-length"] = str(len(compressed))
+                await send(start_message)
+            elif more_body:
+                compressed = encode(encoder.compress, body)
+            else:
+                compressed = encode(encoder.finish, body)
+
+            await send(
+                {"type": "http.response.body", "body": compressed, "more_body": more_body}
+            )
+            if not more_body:
+                COMPRESSION_INPUT_BYTES.labels(encoding=encoding).inc(input_bytes)
+                COMPRESSION_SAVED_BYTES.labels(encoding=encoding).inc(
+                    max(input_bytes - output_bytes, 0)
+                )
+                COMPRESSION_CPU_SECONDS.labels(encoding=encoding).observe(cpu_time)
+
+        await self.app(scope, receive, send_compressed)
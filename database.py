@@ -1,10 +1,116 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.pool import NullPool, QueuePool
 from config import settings
+from monitoring import instrumented_pool_class
+from query_stats import instrument_engine
 
-engine = create_engine(settings.DATABASE_URL)
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def to_async_url(url: str):
+    """Swap the sync DBAPI in a database URL for its asyncio counterpart."""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for '{backend}' databases.")
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+
+def pool_options(url, name: str) -> dict:
+    """create_async_engine() pool arguments for ``url`` from the DB_POOL_* settings."""
+    url = make_url(url)
+    if settings.DB_POOL_MODE == "null":
+        pool_class = NullPool
+    elif settings.DB_POOL_MODE == "queue":
+        pool_class = url.get_dialect().get_pool_class(url)
+    else:
+        raise ValueError(f"Unknown DB_POOL_MODE '{settings.DB_POOL_MODE}'.")
+
+    options = {
+        "poolclass": instrumented_pool_class(pool_class, name),
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    # Only queue pools take sizing. The dialect's default is not always one:
+    # aiosqlite picks StaticPool for :memory: and, before SQLAlchemy 2.0.38,
+    # NullPool for file databases (later releases queue those too).
+    if issubclass(pool_class, QueuePool):
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+        )
+    if pool_class is NullPool and url.get_driver_name() == "asyncpg":
+        # PgBouncer in transaction mode cannot keep prepared statements
+        # across transactions, so disable asyncpg's statement caches.
+        options["connect_args"] = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+        }
+    return options
+
+
+# Sync engine, kept for schema management (create_all, Alembic) and scripts.
+# It is used briefly at startup, so it holds no idle connections.
+engine = create_engine(settings.DATABASE_URL, poolclass=NullPool)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine used by the request handlers so queries never block the event loop.
+async_url = to_async_url(settings.DATABASE_URL)
+async_engine = create_async_engine(async_url, **pool_options(async_url, "primary"))
+instrument_engine(async_engine)
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
 Base = declarative_base()
+
+
+_schema_ready = False
+
+
+def create_schema():
+    """Create any missing tables and the full-text search index."""
+    import models  # noqa: F401  (registers the tables on Base.metadata)
+    from search import install_search_index
+
+    with engine.begin() as connection:
+        Base.metadata.create_all(bind=connection)
+        install_search_index(connection)
+
+
+def init_db():
+    """Run ``create_schema`` once per process.
+
+    Runs from the app lifespan, or from the gunicorn master when the app is
+    preloaded, in which case forked workers inherit the flag and skip it.
+    """
+    global _schema_ready
+    if _schema_ready:
+        return
+    if settings.DB_INIT_SCHEMA:
+        create_schema()
+    _schema_ready = True
+
+
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_sessionmaker():
+    """Session factory for handlers whose work outlives the request scope,
+    such as streaming responses that keep reading after the handler returns."""
+    return AsyncSessionLocal
@@ -0,0 +1,66 @@
+import hashlib
+import json
+
+from fastapi import HTTPException, Response
+from starlette import status
+
+
+def make_etag(*parts) -> str:
+    return '"' + "-".join(str(part) for part in parts) + '"'
+
+
+def todo_etag(todo_id: int, version: int) -> str:
+    return make_etag("t", todo_id, version)
+
+
+def list_etag(owner_id: int, list_version: int, variant) -> str:
+    """ETag for one view (filters, sort, page) of an owner's todo list."""
+    digest = hashlib.sha1(
+        json.dumps(variant, sort_keys=True, default=str).encode()
+    ).hexdigest()[:16]
+    return make_etag("l", owner_id, list_version, digest)
+
+
+def etag_matches(header: str | None, etag: str, weak: bool = True) -> bool:
+    """Check an If-None-Match (weak comparison) or If-Match (strong) header."""
+    if header is None:
+        return False
+    if header.strip() == "*":
+        return True
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if weak and candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def if_match_versions(header: str | None, todo_id: int):
+    """Todo versions an If-Match header accepts.
+
+    ``None`` means the request is unconditional (no header, or ``*``); an
+    empty list means no listed ETag can match this todo.
+    """
+    if header is None or header.strip() == "*":
+        return None
+    prefix = f'"t-{todo_id}-'
+    versions = []
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith(prefix) and candidate.endswith('"'):
+            version = candidate[len(prefix) : -1]
+            if version.isdigit():
+                versions.append(int(version))
+    return versions
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+
+def precondition_failed() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_412_PRECONDITION_FAILED,
+        detail="Todo has been modified.",
+    )
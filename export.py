@@ -0,0 +1,62 @@
+import csv
+import io
+import json
+
+from fastapi.responses import StreamingResponse
+
+EXPORT_CHUNK_SIZE = 1000
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+async def stream_partitions(session_factory, stmt, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield lists of rows from a server-side cursor.
+
+    Opens its own session because a StreamingResponse keeps iterating after
+    the request's dependencies have been torn down.
+    """
+    async with session_factory() as db:
+        result = await db.stream(stmt.execution_options(yield_per=chunk_size))
+        async for rows in result.partitions():
+            yield rows
+
+
+async def encode_ndjson(partitions):
+    async for rows in partitions:
+        yield "".join(
+            json.dumps(dict(row._mapping), separators=(",", ":")) + "\n"
+            for row in rows
+        )
+
+
+async def encode_csv(partitions, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    async for rows in partitions:
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # Header-only export for an empty result.
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_response(session_factory, stmt, export_format: str, filename: str):
+    """Stream the rows of a Core select() as NDJSON or CSV."""
+    partitions = stream_partitions(session_factory, stmt)
+    if export_format == "csv":
+        body = encode_csv(partitions, [column.key for column in stmt.selected_columns])
+    else:
+        body = encode_ndjson(partitions)
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}.{export_format}"'
+        },
+    )
@@ -1,21 +1,59 @@
 # Gunicorn configuration file
+import gc
 import multiprocessing
 import os
+import shutil
+import tempfile
+
+from dotenv import load_dotenv
 
 # Prevent Python from generating __pycache__
 os.environ["PYTHONDONTWRITEBYTECODE"] = "1"
 
+# Prometheus multiprocess mode: each worker writes its metrics to mmap'd
+# files in this directory and /metrics merges them. It has to exist before
+# prometheus_client is imported, and is emptied so a previous run's counters
+# are not merged into this one.
+prometheus_multiproc_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR",
+    os.path.join(tempfile.gettempdir(), "fastapi_todo_metrics"),
+)
+shutil.rmtree(prometheus_multiproc_dir, ignore_errors=True)
+os.makedirs(prometheus_multiproc_dir)
+
 # Server socket
 bind = "0.0.0.0:8000"
 backlog = 2048
 
 # Worker processes
-workers = multiprocessing.cpu_count() * 2 + 1
+# Every worker holds its own database pool; see DB_POOL_SIZE / DB_MAX_OVERFLOW.
+workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+# Several processes cannot share one rotating log file: each renames it on
+# its own, so records are lost and backups overwrite each other. Without an
+# explicit LOG_FILE workers log to stdout only, where gunicorn's output (or
+# the container) collects it; an explicit one becomes one file per worker.
+load_dotenv()
+log_file = os.environ.get("LOG_FILE")
+if log_file is None:
+    os.environ["LOG_FILE"] = ""
+elif log_file and workers > 1 and "{pid}" not in log_file:
+    root, ext = os.path.splitext(log_file)
+    os.environ["LOG_FILE"] = f"{root}.{{pid}}{ext}"
+# The memory todo cache lives in one process, so a write would only
+# invalidate the worker that handled it; with several workers the cache is
+# off unless TODO_CACHE_BACKEND is set (redis, or memory knowingly).
+if workers > 1:
+    os.environ.setdefault("TODO_CACHE_BACKEND", "none")
 worker_class = "uvicorn.workers.UvicornWorker"
 worker_connections = 1000
 timeout = 30
 keepalive = 2
 
+# Load the app once in the master and fork workers from it, so imports,
+# template parsing and the schema check happen once and the loaded modules
+# are shared copy-on-write. Set GUNICORN_PRELOAD=false for per-worker loads.
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+
 # Python optimization
 pythonoptimize = 2  # Enable Python optimization (-OO)
 
@@ -38,3 +76,44 @@ tmp_upload_dir = None
 # SSL config
 # certfile = "/path/to/fullchain.pem"
 # keyfile = "/path/to/privkey.pem"
+
+
+# Server hooks
+def on_starting(server):
+    if log_file and os.environ["LOG_FILE"] != log_file:
+        server.log.warning(
+            "LOG_FILE=%s cannot be shared by %d workers; each writes %s instead",
+            log_file, workers, os.environ["LOG_FILE"],
+        )
+
+
+def when_ready(server):
+    if not server.cfg.preload_app:
+        return
+    from database import init_db
+    from rendering import preload_templates
+
+    init_db()
+    preload_templates()
+    # Move everything loaded so far out of the collector's view; otherwise
+    # the first collection in each worker touches, and so copies, every page.
+    gc.freeze()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    # Drop the dead worker's live gauges; its counters stay in the totals.
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def post_fork(server, worker):
+    if not server.cfg.preload_app:
+        return
+    from database import async_engine
+    from replicas import replica_router
+
+    # Never share pooled connections opened before the fork with the master.
+    engines = [async_engine, *(replica_router.engines if replica_router else [])]
+    for engine in engines:
+        engine.sync_engine.dispose(close=False)
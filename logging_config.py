@@ -0,0 +1,305 @@
+"""Application logging: records are queued by the caller and written by a
+background listener thread, so request handlers never wait on disk I/O.
+
+``configure_logging()`` installs a bounded ``QueueHandler`` on the root
+logger. The listener formats records as JSON lines (or plain text) and
+writes them to stdout and to a size-rotated file in batches.
+"""
+
+import atexit
+import copy
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from contextvars import ContextVar
+
+import orjson
+from prometheus_client import Counter
+
+from config import settings
+
+# Set per request by MonitoringMiddleware; attached to every log record.
+request_id_ctx: ContextVar[str | None] = ContextVar("request_id", default=None)
+
+TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+LOG_RECORDS_DROPPED = Counter(
+    "log_records_dropped_count",
+    "Log records dropped because the logging queue was full",
+)
+
+
+def current_span():
+    """The active OpenTelemetry span, or None if tracing was never loaded.
+
+    OpenTelemetry is optional at runtime, so it is not imported here just to
+    find out that no span exists.
+    """
+    otel_trace = sys.modules.get("opentelemetry.trace")
+    return None if otel_trace is None else otel_trace.get_current_span()
+
+
+def parse_sample_rates(value: str) -> dict[int, float]:
+    """Parse ``"DEBUG=0.01,INFO=0.5"`` into ``{levelno: rate}``."""
+    rates = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        level, _, rate = item.partition("=")
+        levelno = logging.getLevelName(level.strip().upper())
+        if not isinstance(levelno, int):
+            raise ValueError(f"Unknown log level '{level}' in LOG_SAMPLE_RATES.")
+        rates[levelno] = float(rate)
+    return rates
+
+
+class ContextFilter(logging.Filter):
+    """Attach the request ID and trace/span IDs while still in the caller's
+    context; the listener thread that formats the record has neither."""
+
+    def filter(self, record):
+        record.request_id = request_id_ctx.get()
+        record.trace_id = record.span_id = None
+        span = current_span()
+        if span is not None:
+            span_context = span.get_span_context()
+            if span_context.is_valid:
+                record.trace_id = format(span_context.trace_id, "032x")
+                record.span_id = format(span_context.span_id, "016x")
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of records at the sampled levels; WARNING and
+    above are never sampled unless configured explicitly."""
+
+    def __init__(self, rates: dict[int, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record):
+        rate = self.rates.get(record.levelno, 1.0)
+        return rate >= 1 or random.random() < rate
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        payload = {
+            "timestamp": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key in ("request_id", "trace_id", "span_id"):
+            value = getattr(record, key, None)
+            if value is not None:
+                payload[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload["exception"] = record.exc_text
+        return orjson.dumps(payload, default=str).decode()
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops (and counts) records when the queue is full
+    instead of blocking the caller or printing an error per record."""
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+    def prepare(self, record):
+        # Merge args and render the traceback now, keeping them separate
+        # so the JSON formatter can still emit the exception as its own field.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class BatchingRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Size-rotated file handler that writes formatted records in batches.
+
+    Records are buffered until ``batch_size`` accumulate or the listener goes
+    idle and calls ``flush``.
+    """
+
+    def __init__(self, filename, max_bytes, backup_count, batch_size):
+        super().__init__(
+            filename,
+            maxBytes=max_bytes,
+            backupCount=backup_count,
+            encoding="utf-8",
+            delay=True,
+        )
+        self.batch_size = batch_size
+        self.buffer = []
+
+    def emit(self, record):
+        try:
+            self.buffer.append(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+            return
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        self.acquire()
+        try:
+            if self.buffer:
+                data = "".join(self.buffer)
+                self.buffer.clear()
+                if self.stream is None:
+                    self.stream = self._open()
+                position = self.stream.tell()
+                if 0 < self.maxBytes <= position + len(data) and position > 0:
+                    self.doRollover()
+                    if self.stream is None:
+                        self.stream = self._open()
+                self.stream.write(data)
+            super().flush()
+        finally:
+            self.release()
+
+    def close(self):
+        self.flush()
+        super().close()
+
+
+class StdoutHandler(logging.StreamHandler):
+    """StreamHandler bound to whatever ``sys.stdout`` is at write time, so
+    a replaced stream (e.g. test output capture) is never written once closed."""
+
+    def __init__(self):
+        super().__init__()
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+class FlushingQueueListener(logging.handlers.QueueListener):
+    """QueueListener that flushes its handlers whenever the queue is idle
+    for ``flush_interval`` seconds, so batched records are not held back."""
+
+    def __init__(self, log_queue, *handlers, flush_interval=1.0):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.flush_interval = flush_interval
+
+    def dequeue(self, block):
+        while True:
+            try:
+                return self.queue.get(block, self.flush_interval)
+            except queue.Empty:
+                for handler in self.handlers:
+                    handler.flush()
+
+    def enqueue_sentinel(self):
+        # Wait for room rather than failing when stopping with a full queue.
+        self.queue.put(self._sentinel)
+
+    def stop(self):
+        if self._thread is None:
+            return
+        super().stop()
+        for handler in self.handlers:
+            handler.flush()
+
+
+_listener = None
+_queue_handler = None
+
+
+def build_handlers(config):
+    formatter = (
+        JsonFormatter()
+        if config.LOG_FORMAT == "json"
+        else logging.Formatter(TEXT_FORMAT)
+    )
+    console = StdoutHandler()
+    console.setFormatter(formatter)
+    handlers = [console]
+    if config.LOG_FILE:
+        # "{pid}" gives every process its own file to rotate (gunicorn workers)
+        file_handler = BatchingRotatingFileHandler(
+            config.LOG_FILE.replace("{pid}", str(os.getpid())),
+            max_bytes=config.LOG_FILE_MAX_BYTES,
+            backup_count=config.LOG_FILE_BACKUP_COUNT,
+            batch_size=config.LOG_BATCH_SIZE,
+        )
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+    return handlers
+
+
+def configure_logging(config=settings):
+    """Route the root logger through a queue to a background writer thread.
+
+    Safe to call again; the previous listener is stopped first.
+    """
+    global _listener, _queue_handler
+    shutdown_logging()
+
+    log_queue = queue.Queue(maxsize=config.LOG_QUEUE_SIZE)
+    _queue_handler = DroppingQueueHandler(log_queue)
+    _queue_handler.addFilter(ContextFilter())
+    rates = parse_sample_rates(config.LOG_SAMPLE_RATES)
+    if rates:
+        _queue_handler.addFilter(SamplingFilter(rates))
+
+    root = logging.getLogger()
+    root.addHandler(_queue_handler)
+    root.setLevel(config.LOG_LEVEL.upper())
+
+    _listener = FlushingQueueListener(
+        log_queue, *build_handlers(config), flush_interval=config.LOG_FLUSH_INTERVAL
+    )
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging():
+    """Stop the listener, writing out everything still queued or buffered."""
+    global _listener, _queue_handler
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+
+
+def _restart_in_child():
+    """Threads do not survive fork: give a forked child (e.g. a gunicorn
+    worker from a preloaded master) its own queue and listener thread."""
+    global _listener
+    if _listener is None:
+        return
+    handlers = _listener.handlers
+    for handler in handlers:
+        # Records buffered by the parent are the parent's to write.
+        getattr(handler, "buffer", []).clear()
+    log_queue = queue.Queue(maxsize=_listener.queue.maxsize)
+    _queue_handler.queue = log_queue
+    _listener = FlushingQueueListener(
+        log_queue, *handlers, flush_interval=_listener.flush_interval
+    )
+    _listener.start()
+
+
+atexit.register(shutdown_logging)
+os.register_at_fork(after_in_child=_restart_in_child)
@@ -1,35 +1,76 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request, status, HTTPException
-from models import Base
-from database import engine
+from config import settings
+from database import async_engine, init_db
+from logging_config import configure_logging, shutdown_logging
+from passwords import password_hasher
 from routers import auth, todos, admin, users
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import RedirectResponse, JSONResponse
+from assets import BUILD_DIR, PrecompressedStaticFiles
+from compression import CompressionMiddleware
+from fastapi.responses import ORJSONResponse, RedirectResponse
+from pydantic import BaseModel
 from monitoring import setup_monitoring
+from replicas import PrimaryPinMiddleware
 import logging
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Per process, so each gunicorn worker starts its own writer thread
+    configure_logging()
+    init_db()
+    yield
+    password_hasher.shutdown(wait=False)
+    await async_engine.dispose()
+    shutdown_logging()
+
+
 # Create FastAPI app
 app = FastAPI(
+    lifespan=lifespan,
     title="Todo App API",
     description="A FastAPI application for managing todos with monitoring",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
 )
 
+# Compress responses innermost, so monitoring times include compression
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
 # Setup monitoring first
 setup_monitoring(app)
 
-# Initialize database
-Base.metadata.create_all(bind=engine)
+# Keep clients on the primary database right after they write
+app.add_middleware(PrimaryPinMiddleware)
+
+# Tracing outermost, so the access log and SQL stats fall inside the span
+if settings.TRACING_ENABLED:
+    from tracing import setup_tracing
 
-# Mount static files
+    setup_tracing(app)
+
+# Mount static files: the source files, and the fingerprinted, precompressed
+# copies built by `python -m assets` that templates link via static_url()
 app.mount("/static", StaticFiles(directory="static"), name="static")
+app.mount(
+    "/assets",
+    PrecompressedStaticFiles(directory=BUILD_DIR, check_dir=False),
+    name="assets",
+)
+
+class HealthResponse(BaseModel):
+    status: str
+
 
-@app.get("/")
+@app.get("/", response_class=RedirectResponse)
 def test(request: Request):
     return RedirectResponse(url="/todos/todo-page", status_code=status.HTTP_302_FOUND)
 
-@app.get("/health")
+@app.get("/health", response_model=HealthResponse)
 def health_check():
     return {"status": "Healthy"}
 
@@ -41,7 +82,7 @@ app.include_router(users.router)
 
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={"detail": exc.detail}
     )
@@ -1,5 +1,6 @@
 from database import Base
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Index
+from sqlalchemy import func, literal_column
 
 
 class Users(Base):
@@ -14,6 +15,8 @@ class Users(Base):
     is_active = Column(Boolean, default=True)
     role = Column(String)
     phone_number = Column(String)
+    # Bumped on every change to the user's todos; drives list ETags.
+    todo_list_version = Column(Integer, nullable=False, default=0, server_default="0")
 
 
 class Todos(Base):
@@ -25,3 +28,32 @@ class Todos(Base):
     priority = Column(Integer)
     complete = Column(Boolean, default=False)
     owner_id = Column(Integer, ForeignKey("users.id"))
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+
+    # Optimistic concurrency: ORM updates/deletes check and bump `version`.
+    __mapper_args__ = {"version_id_col": version}
+
+    # Keyset pagination walks (owner_id, id) and (owner_id, priority, id),
+    # with NULL priorities sorting as 0 (pagination.NULL_SORT_VALUES).
+    __table_args__ = (
+        Index("ix_todos_owner_id_id", "owner_id", "id"),
+        Index(
+            "ix_todos_owner_id_priority_id",
+            owner_id,
+            func.coalesce(priority, literal_column("0")),
+            id,
+        ),
+    )
+
+
+class RefreshTokens(Base):
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    jti = Column(String, unique=True, index=True, nullable=False)
+    # Every token issued from one login shares a family; reuse of a rotated
+    # token revokes the whole family.
+    family_id = Column(String, index=True, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True, nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    revoked = Column(Boolean, default=False, nullable=False)
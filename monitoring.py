@@ -1,21 +1,28 @@
+import os
+import re
 import time
 import logging
-from typing import Callable
-from fastapi import Request, Response, FastAPI
-from starlette.middleware.base import BaseHTTPMiddleware
-from datetime import datetime
-from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+import random
+import uuid
+from fastapi import Response, FastAPI
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+    CONTENT_TYPE_LATEST,
+    multiprocess,
+)
 from prometheus_fastapi_instrumentator import Instrumentator, metrics
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+from config import settings
+from logging_config import request_id_ctx
+from query_stats import QueryStatsMiddleware
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('app.log'),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
 # Prometheus metrics
@@ -37,6 +44,34 @@ ERROR_COUNT = Counter(
     ['method', 'endpoint', 'error_type']
 )
 
+# Database connection pool metrics, labelled by pool name
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    'db_pool_checkout_wait_seconds',
+    'Time spent waiting to check a connection out of the pool',
+    ['pool'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+DB_POOL_CHECKOUT_TIMEOUTS = Counter(
+    'db_pool_checkout_timeout_count',
+    'Pool checkouts that gave up after pool_timeout',
+    ['pool']
+)
+
+DB_POOL_CHECKED_OUT = Gauge(
+    'db_pool_checked_out',
+    'Database connections currently checked out',
+    ['pool'],
+    multiprocess_mode='livesum'
+)
+
+DB_POOL_OVERFLOW = Gauge(
+    'db_pool_overflow',
+    'Database connections open beyond pool_size',
+    ['pool'],
+    multiprocess_mode='livesum'
+)
+
 # Initialize instrumentator globally
 instrumentator = Instrumentator(
     should_group_status_codes=False,
@@ -82,62 +117,168 @@ instrumentator.add(
     )
 )
 
+def instrumented_pool_class(base, name: str):
+    """Subclass of pool class ``base`` that exports its metrics as ``name``.
+
+    Pools have no event before a checkout starts, and their checkin event
+    fires before the connection is back in the pool, so the metrics are
+    taken around ``_do_get`` and ``_do_return_conn`` instead.
+    """
+    def record(pool, delta: int):
+        if isinstance(pool, QueuePool):
+            DB_POOL_CHECKED_OUT.labels(pool=name).set(pool.checkedout())
+            DB_POOL_OVERFLOW.labels(pool=name).set(max(pool.overflow(), 0))
+        else:
+            DB_POOL_CHECKED_OUT.labels(pool=name).inc(delta)
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = base._do_get(self)
+        except exc.TimeoutError:
+            DB_POOL_CHECKOUT_TIMEOUTS.labels(pool=name).inc()
+            raise
+        finally:
+            DB_POOL_CHECKOUT_WAIT.labels(pool=name).observe(
+                time.perf_counter() - start
+            )
+        record(self, 1)
+        return connection
+
+    def _do_return_conn(self, record_):
+        base._do_return_conn(self, record_)
+        record(self, -1)
+
+    return type(
+        f"Instrumented{base.__name__}",
+        (base,),
+        {"_do_get": _do_get, "_do_return_conn": _do_return_conn},
+    )
+
+
+_multiprocess_registry = None
+
+
+def metrics_registry():
+    """Registry served on /metrics.
+
+    Under gunicorn every worker writes its metrics to mmap'd files in
+    PROMETHEUS_MULTIPROC_DIR (see gunicorn.conf.py), and this registry
+    merges them all so any worker can answer a scrape for the whole server.
+    Without that variable it is the process's own default registry.
+    """
+    global _multiprocess_registry
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+    if _multiprocess_registry is None:
+        _multiprocess_registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(_multiprocess_registry)
+    return _multiprocess_registry
+
+
 def metrics_endpoint():
     """Generate Prometheus metrics response."""
     return Response(
-        generate_latest(),
+        generate_latest(metrics_registry()),
         media_type=CONTENT_TYPE_LATEST
     )
 
-class MonitoringMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        start_time = time.time()
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        method = request.method
-        path = request.url.path
-        
+REQUEST_ID_PATTERN = re.compile(r"[A-Za-z0-9._-]{1,128}")
+
+
+def incoming_request_id(scope) -> str | None:
+    """A well-formed X-Request-ID sent by the client or a proxy, if any."""
+    for name, value in scope["headers"]:
+        if name == b"x-request-id":
+            value = value.decode("latin-1")
+            return value if REQUEST_ID_PATTERN.fullmatch(value) else None
+    return None
+
+
+def route_template(scope, root_path: str) -> str:
+    """Low-cardinality label for a handled request: the matched route's
+    template, ``<mount>/{path:path}`` for mounted apps, else ``unmatched``."""
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    if scope.get("root_path", "") != root_path:
+        return scope["root_path"] + "/{path:path}"
+    return "unmatched"
+
+
+class MonitoringMiddleware:
+    """Pure ASGI middleware recording request count, latency and errors.
+
+    Metrics are labelled by route template rather than raw path, so
+    ``/todos/todo/1`` and ``/todos/todo/2`` share one series. Successful
+    requests are logged for a ``sample_rate`` fraction of requests; errors
+    are always logged.
+    """
+
+    def __init__(self, app, sample_rate: float | None = None):
+        self.app = app
+        if sample_rate is None:
+            sample_rate = settings.ACCESS_LOG_SAMPLE_RATE
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        root_path = scope.get("root_path", "")
+        method = scope["method"]
+        status_code = 500
+        request_id = incoming_request_id(scope) or uuid.uuid4().hex
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message.setdefault("headers", [])
+                message["headers"] = [
+                    *message["headers"],
+                    (b"x-request-id", request_id.encode()),
+                ]
+            await send(message)
+
+        token = request_id_ctx.set(request_id)
         try:
-            # Process the request
-            response = await call_next(request)
-            
-            # Calculate response time
-            process_time = time.time() - start_time
-            
-            # Update Prometheus metrics
-            REQUEST_COUNT.labels(
-                method=method,
-                endpoint=path,
-                status_code=response.status_code
-            ).inc()
-            
-            REQUEST_LATENCY.labels(
-                method=method,
-                endpoint=path
-            ).observe(process_time)
-            
-            # Log successful request
-            logger.info(
-                f"[{timestamp}] {method} {path} "
-                f"- Status: {response.status_code} "
-                f"- Time: {process_time:.3f}s"
-            )
-            
-            return response
-            
+            await self.app(scope, receive, send_with_status)
         except Exception as e:
-            # Update error metrics
             ERROR_COUNT.labels(
                 method=method,
-                endpoint=path,
+                endpoint=route_template(scope, root_path),
                 error_type=type(e).__name__
             ).inc()
-            
-            # Log error
-            logger.error(
-                f"[{timestamp}] {method} {path} "
-                f"- Error: {str(e)}"
-            )
+            logger.error("%s %s - Error: %s", method, scope["path"], e)
             raise
+        else:
+            process_time = time.perf_counter() - start_time
+            endpoint = route_template(scope, root_path)
+            REQUEST_COUNT.labels(
+                method=method,
+                endpoint=endpoint,
+                status_code=status_code
+            ).inc()
+            REQUEST_LATENCY.labels(
+                method=method,
+                endpoint=endpoint
+            ).observe(process_time)
+
+            if (
+                status_code >= 400
+                or self.sample_rate >= 1
+                or random.random() < self.sample_rate
+            ):
+                logger.info(
+                    "%s %s - Status: %d - Time: %.3fs",
+                    method, scope["path"], status_code, process_time
+                )
+        finally:
+            request_id_ctx.reset(token)
+
 
 def setup_monitoring(app: FastAPI):
     """Setup Prometheus monitoring with FastAPI instrumentator"""
@@ -145,5 +286,11 @@ def setup_monitoring(app: FastAPI):
     # Instrument app
     instrumentator.instrument(app)
 
+    # Per-request SQL statement counts and timings
+    app.add_middleware(QueryStatsMiddleware)
+
+    # Request count, latency, errors and sampled access logs by route
+    app.add_middleware(MonitoringMiddleware)
+
     # Add metrics endpoint
     app.get("/metrics", include_in_schema=True, tags=["monitoring"])(metrics_endpoint) 
\ No newline at end of file
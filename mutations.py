@@ -0,0 +1,44 @@
+from fastapi import HTTPException
+from sqlalchemy import delete, update
+from starlette import status
+
+
+async def execute_returning(
+    db, stmt, detail: str, status_code: int = status.HTTP_404_NOT_FOUND
+):
+    """Run a single UPDATE/DELETE ... RETURNING and return the affected row.
+
+    No returned row means the conditions matched nothing, which is reported
+    as a 404 (or ``status_code``, e.g. 409 when a condition guards against a
+    concurrent change) without a separate SELECT.
+    """
+    result = await db.execute(stmt.execution_options(synchronize_session=False))
+    row = result.first()
+    if row is None:
+        raise HTTPException(status_code=status_code, detail=detail)
+    return row
+
+
+async def update_one(
+    db,
+    model,
+    criteria,
+    values: dict,
+    returning,
+    detail: str,
+    status_code: int = status.HTTP_404_NOT_FOUND,
+):
+    stmt = update(model).where(*criteria).values(**values).returning(*returning)
+    return await execute_returning(db, stmt, detail, status_code)
+
+
+async def delete_one(
+    db,
+    model,
+    criteria,
+    returning,
+    detail: str,
+    status_code: int = status.HTTP_404_NOT_FOUND,
+):
+    stmt = delete(model).where(*criteria).returning(*returning)
+    return await execute_returning(db, stmt, detail, status_code)
@@ -0,0 +1,105 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from fastapi import HTTPException, Response
+from sqlalchemy import func, literal_column, tuple_
+from starlette import status
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Every sortable column is an INTEGER; cursor values must fit one.
+CURSOR_VALUE_RANGE = range(-(2**31), 2**31)
+
+# Value a NULL sorts as, for nullable sort fields: a todo without a priority
+# sorts below priority 1. Keyset comparisons against NULL are never true, so
+# without it those rows would drop out of every page after the first.
+NULL_SORT_VALUES = {"priority": 0}
+
+
+def keyset_fields(sort: str):
+    """Return the fields a sort key orders by (always ending in the primary
+    key so the ordering is total) and whether the order is descending."""
+    descending = sort.startswith("-")
+    field = sort.lstrip("-")
+    if field == "id":
+        return ["id"], descending
+    return [field, "id"], descending
+
+
+def sort_expression(model, field: str):
+    column = getattr(model, field)
+    if field not in NULL_SORT_VALUES:
+        return column
+    # A literal rather than a bound parameter, so the expression matches the
+    # coalesce() index on the column.
+    return func.coalesce(column, literal_column(str(NULL_SORT_VALUES[field])))
+
+
+def sort_value(row, field: str):
+    value = getattr(row, field)
+    return NULL_SORT_VALUES.get(field) if value is None else value
+
+
+def encode_cursor(sort: str, values: list) -> str:
+    payload = json.dumps({"s": sort, "k": values}, separators=(",", ":"))
+    return urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, size: int) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(urlsafe_b64decode(padded.encode()))
+        values = payload["k"]
+        valid = (
+            payload["s"] == sort
+            and isinstance(values, list)
+            and len(values) == size
+            and all(
+                type(value) is int and value in CURSOR_VALUE_RANGE
+                for value in values
+            )
+        )
+    except (ValueError, KeyError, TypeError):
+        valid = False
+    if not valid:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor.",
+        )
+    return values
+
+
+def paginate(stmt, model, sort: str, cursor: str | None, limit: int):
+    """Apply keyset pagination to a select() of ``model``.
+
+    Fetches one extra row so ``next_cursor`` can tell whether another page
+    exists without a COUNT query.
+    """
+    fields, descending = keyset_fields(sort)
+    columns = [sort_expression(model, field) for field in fields]
+    if cursor is not None:
+        values = decode_cursor(cursor, sort, len(columns))
+        if len(columns) == 1:
+            key, after = columns[0], values[0]
+        else:
+            key, after = tuple_(*columns), tuple_(*values)
+        stmt = stmt.where(key < after if descending else key > after)
+    order_by = [column.desc() if descending else column.asc() for column in columns]
+    return stmt.order_by(*order_by).limit(limit + 1)
+
+
+def next_cursor(rows: list, model, sort: str, limit: int):
+    """Trim the look-ahead row and return ``(page, cursor_or_None)``."""
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    fields, _ = keyset_fields(sort)
+    last = page[-1]
+    return page, encode_cursor(sort, [sort_value(last, field) for field in fields])
+
+
+def set_next_cursor(response: Response, cursor: str | None):
+    if cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
@@ -0,0 +1,132 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+from prometheus_client import Counter, Gauge, Histogram
+from starlette import status
+
+from config import settings
+
+bcrypt_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+HASH_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.5, 5.0)
+
+PASSWORD_QUEUE_WAIT = Histogram(
+    "password_hash_queue_wait_seconds",
+    "Time a password operation waited for a free hashing worker",
+    ["operation"],
+    buckets=(0.0, 0.001, 0.005) + HASH_BUCKETS,
+)
+
+PASSWORD_HASH_TIME = Histogram(
+    "password_hash_duration_seconds",
+    "Time spent inside bcrypt per password operation",
+    ["operation"],
+    buckets=HASH_BUCKETS,
+)
+
+PASSWORD_QUEUE_DEPTH = Gauge(
+    "password_hash_queue_depth",
+    "Password operations submitted and not yet finished",
+    multiprocess_mode="livesum",
+)
+
+PASSWORD_REJECTED = Counter(
+    "password_hash_rejected_count",
+    "Password operations rejected because the hashing queue was full",
+    ["operation"],
+)
+
+
+# Module-level so they can be pickled into a process pool.
+def _timed_hash(password: str):
+    start = time.perf_counter()
+    hashed = bcrypt_context.hash(password)
+    return hashed, time.perf_counter() - start
+
+
+def _timed_verify(password: str, hashed_password: str):
+    start = time.perf_counter()
+    verified = bcrypt_context.verify(password, hashed_password)
+    return verified, time.perf_counter() - start
+
+
+class PasswordHasher:
+    """Runs bcrypt on a worker pool so hashing never blocks the event loop.
+
+    ``executor`` is ``"thread"`` (bcrypt releases the GIL while hashing) or
+    ``"process"``. At most ``max_queue`` operations may be in flight; beyond
+    that callers get a 503 instead of piling up behind the pool.
+    """
+
+    def __init__(self, executor: str = "thread", max_workers=None, max_queue=64):
+        if executor not in ("thread", "process"):
+            raise ValueError(f"Unknown password hash executor '{executor}'.")
+        self.executor_kind = executor
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.max_queue = max_queue
+        self._executor: Executor | None = None
+        self._pending = 0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_kind == "process":
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="password-hasher",
+                )
+        return self._executor
+
+    async def _run(self, operation: str, func, *args):
+        if self._pending >= self.max_queue:
+            PASSWORD_REJECTED.labels(operation=operation).inc()
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server busy, please retry.",
+            )
+
+        self._pending += 1
+        PASSWORD_QUEUE_DEPTH.inc()
+        submitted = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            result, hash_time = await loop.run_in_executor(
+                self._get_executor(), func, *args
+            )
+        finally:
+            self._pending -= 1
+            PASSWORD_QUEUE_DEPTH.dec()
+
+        elapsed = time.perf_counter() - submitted
+        PASSWORD_HASH_TIME.labels(operation=operation).observe(hash_time)
+        PASSWORD_QUEUE_WAIT.labels(operation=operation).observe(
+            max(elapsed - hash_time, 0.0)
+        )
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", _timed_hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run("verify", _timed_verify, password, hashed_password)
+
+    def shutdown(self, wait: bool = True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    executor=settings.PASSWORD_HASH_EXECUTOR,
+    max_workers=settings.PASSWORD_HASH_WORKERS or None,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+)
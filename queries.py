@@ -0,0 +1,33 @@
+from sqlalchemy import select
+
+from models import Todos
+
+# Column set served by the read endpoints; matches TodoResponse.
+TODO_COLUMNS = (
+    Todos.id,
+    Todos.title,
+    Todos.description,
+    Todos.priority,
+    Todos.complete,
+    Todos.owner_id,
+)
+
+
+def select_todos(*extra_columns):
+    """Core select() of the todo columns, without loading ORM entities."""
+    return select(*TODO_COLUMNS, *extra_columns)
+
+
+async def fetch_rows(db, stmt) -> list:
+    """Execute ``stmt`` on the session's connection and return plain rows.
+
+    Going through the connection skips ORM result processing: no instances
+    are built, nothing lands in the identity map, and the rows are released
+    with the list.
+    """
+    connection = await db.connection()
+    return (await connection.execute(stmt)).all()
+
+
+def rows_to_dicts(rows) -> list[dict]:
+    return [row._asdict() for row in rows]
@@ -0,0 +1,142 @@
+"""Per-request SQL statistics collected from SQLAlchemy engine events."""
+
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from prometheus_client import Histogram
+from sqlalchemy import event
+
+from config import settings
+from logging_config import current_span
+
+logger = logging.getLogger(__name__)
+
+MAX_STATEMENT_LENGTH = 1000
+
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request",
+    "SQL statements executed per request",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+)
+
+DB_TIME_PER_REQUEST = Histogram(
+    "db_time_per_request_seconds",
+    "Time spent executing SQL per request",
+    ["route"],
+)
+
+
+class QueryStats:
+    """SQL statements run while handling one request."""
+
+    __slots__ = ("count", "total_time", "slowest_time", "slowest_statement", "repeats")
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_statement = None
+        self.repeats = Counter()
+
+    def record(self, statement: str, duration: float):
+        self.count += 1
+        self.total_time += duration
+        self.repeats[statement] += 1
+        if self.slowest_statement is None or duration > self.slowest_time:
+            self.slowest_time = duration
+            self.slowest_statement = statement
+
+    def most_repeated(self):
+        """``(statement, count)`` for the statement run most often, if any."""
+        if not self.repeats:
+            return None, 0
+        return self.repeats.most_common(1)[0]
+
+
+query_stats_ctx: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+def instrument_engine(engine):
+    """Feed every statement ``engine`` runs into the current request's stats.
+
+    The context variable is visible from SQLAlchemy's greenlet, so the hooks
+    also see statements issued through an AsyncEngine.
+    """
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        if query_stats_ctx.get() is not None:
+            conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, many):
+        stats = query_stats_ctx.get()
+        if stats is not None:
+            start = conn.info["query_start_time"].pop()
+            stats.record(statement, time.perf_counter() - start)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(exception_context):
+        connection = exception_context.connection
+        if query_stats_ctx.get() is not None and connection is not None:
+            starts = connection.info.get("query_start_time")
+            if starts:
+                starts.pop()
+
+
+def report(stats: QueryStats, route: str):
+    """Export ``stats`` to Prometheus and the current span, and flag N+1s."""
+    DB_QUERIES_PER_REQUEST.labels(route=route).observe(stats.count)
+    DB_TIME_PER_REQUEST.labels(route=route).observe(stats.total_time)
+
+    statement, repeats = stats.most_repeated()
+    span = current_span()
+    if span is not None and span.is_recording():
+        span.set_attribute("db.query_count", stats.count)
+        span.set_attribute("db.total_time", stats.total_time)
+        if stats.slowest_statement is not None:
+            span.set_attribute("db.slowest_time", stats.slowest_time)
+            span.set_attribute(
+                "db.slowest_statement",
+                stats.slowest_statement[:MAX_STATEMENT_LENGTH],
+            )
+            span.set_attribute("db.max_statement_repeats", repeats)
+
+    if repeats >= settings.SQL_REPEATED_STATEMENT_THRESHOLD > 0:
+        logger.warning(
+            "Possible N+1 query on %s: statement ran %d times: %s",
+            route,
+            repeats,
+            statement[:MAX_STATEMENT_LENGTH],
+        )
+
+
+class QueryStatsMiddleware:
+    """ASGI middleware that collects SQL stats for each HTTP request.
+
+    Stats are labelled with the matched route template (``/todos/todo/{todo_id}``)
+    so metrics stay low-cardinality; requests that match no route and ran
+    no SQL are not recorded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = query_stats_ctx.set(stats)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            query_stats_ctx.reset(token)
+            route = getattr(scope.get("route"), "path", None)
+            if route is not None or stats.count:
+                report(stats, route or "unmatched")
@@ -0,0 +1,122 @@
+"""Shared Jinja environment and helpers for the HTML pages."""
+
+import jinja2
+from fastapi.templating import Jinja2Templates
+from markupsafe import Markup
+from starlette.responses import StreamingResponse
+
+from assets import static_url
+from config import settings
+
+TEMPLATE_DIR = "templates"
+
+# Chunks yielded by Template.generate() are tiny (one per text run or
+# expression); they are joined up to this size before being sent.
+STREAM_CHUNK_SIZE = 16 * 1024
+
+
+def build_environment(config=settings) -> jinja2.Environment:
+    """Jinja environment for the app's templates.
+
+    Outside TEMPLATE_AUTO_RELOAD (development), templates are never re-checked
+    on disk once loaded. Compiled templates are kept in a bytecode cache so
+    new processes skip parsing and compiling them.
+    """
+    bytecode_cache = None
+    if config.TEMPLATE_BYTECODE_CACHE:
+        bytecode_cache = jinja2.FileSystemBytecodeCache(
+            config.TEMPLATE_BYTECODE_CACHE_DIR or None
+        )
+    return jinja2.Environment(
+        loader=jinja2.FileSystemLoader(TEMPLATE_DIR),
+        autoescape=True,
+        auto_reload=config.TEMPLATE_AUTO_RELOAD,
+        bytecode_cache=bytecode_cache,
+    )
+
+
+# One template environment per process, shared by every router so templates
+# are parsed and cached once (and shared copy-on-write under preload_app).
+templates = Jinja2Templates(env=build_environment())
+templates.env.globals["static_url"] = static_url
+
+
+def preload_templates():
+    """Load every template now, e.g. in the gunicorn master before forking."""
+    for name in templates.env.list_templates(extensions=["html"]):
+        templates.get_template(name)
+
+
+def render_fragment(name: str, **context) -> Markup:
+    """Render a partial template to markup that can be cached and embedded."""
+    return Markup(templates.get_template(name).render(context))
+
+
+class StreamedFragment:
+    """A partial template rendered in pieces of about ``STREAM_CHUNK_SIZE``
+    while the page embedding it streams
+    (``{% for chunk in rows %}{{ chunk }}{% endfor %}``).
+
+    Once rendered to the end, ``html`` holds the whole fragment for caching;
+    it stays None if the response was cut short.
+    """
+
+    def __init__(self, name: str, **context):
+        self.name = name
+        self.context = context
+        self.html = None
+
+    def __iter__(self):
+        chunks = []
+        generated = templates.get_template(self.name).generate(self.context)
+        for chunk in join_chunks(generated):
+            chunks.append(chunk)
+            yield Markup(chunk)
+        self.html = Markup("".join(chunks))
+
+
+def join_chunks(chunks, size: int = STREAM_CHUNK_SIZE):
+    """Join small template chunks up to ``size``; large ones (e.g. a cached
+    fragment) are passed through without being copied."""
+    buffer = []
+    buffered = 0
+    for chunk in chunks:
+        if len(chunk) >= size:
+            if buffer:
+                yield "".join(buffer)
+                buffer.clear()
+                buffered = 0
+            yield chunk
+            continue
+        buffer.append(chunk)
+        buffered += len(chunk)
+        if buffered >= size:
+            yield "".join(buffer)
+            buffer.clear()
+            buffered = 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def stream_template(
+    name: str, context: dict, status_code: int = 200, background=None
+):
+    """Stream ``name`` as it renders, instead of building the page in memory.
+
+    Like ``TemplateResponse``, ``context`` must include the ``request``.
+    ``background`` runs once the body has been sent.
+    """
+    template = templates.get_template(name)
+
+    async def body():
+        # Rendering is CPU-only, so it runs inline; control returns to the
+        # event loop each time a chunk is sent.
+        for chunk in join_chunks(template.generate(context)):
+            yield chunk
+
+    return StreamingResponse(
+        body(),
+        status_code=status_code,
+        media_type="text/html; charset=utf-8",
+        background=background,
+    )
@@ -0,0 +1,149 @@
+"""Routing of read-only handlers to read replicas.
+
+Handlers that only read depend on ``get_read_db``; it hands out a session on
+one of the DATABASE_REPLICA_URLS, or the primary session from ``get_db``
+when no replicas are configured or the client recently wrote. After a
+successful write, ``PrimaryPinMiddleware`` sets a short-lived cookie so the
+client's follow-up reads see its own writes despite replication lag. Only
+reads served by the primary fill the todo cache (``served_by_replica``).
+"""
+
+import itertools
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, Request
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from starlette.datastructures import MutableHeaders
+
+from config import settings
+from database import get_db, pool_options, to_async_url
+from query_stats import instrument_engine
+
+PRIMARY_PIN_COOKIE = "db_primary_until"
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+STRATEGIES = ("round_robin", "least_connections")
+
+
+class ReplicaRouter:
+    """Picks a replica engine for each read session.
+
+    ``round_robin`` rotates through the replicas; ``least_connections``
+    picks the one with the fewest sessions open from this process, breaking
+    ties in rotation.
+    """
+
+    def __init__(self, engines, strategy: str = "round_robin"):
+        if not engines:
+            raise ValueError("ReplicaRouter needs at least one engine.")
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown replica strategy '{strategy}'.")
+        self.engines = list(engines)
+        self.strategy = strategy
+        self.in_flight = [0] * len(self.engines)
+        self._turn = itertools.count()
+        self._sessionmakers = [
+            async_sessionmaker(
+                bind=engine,
+                class_=AsyncSession,
+                autoflush=False,
+                expire_on_commit=False,
+                info={"replica": True},
+            )
+            for engine in self.engines
+        ]
+
+    def choose(self) -> int:
+        count = len(self.engines)
+        start = next(self._turn) % count
+        if self.strategy == "round_robin":
+            return start
+        order = [(start + offset) % count for offset in range(count)]
+        return min(order, key=self.in_flight.__getitem__)
+
+    @asynccontextmanager
+    async def session(self):
+        index = self.choose()
+        self.in_flight[index] += 1
+        try:
+            async with self._sessionmakers[index]() as db:
+                yield db
+        finally:
+            self.in_flight[index] -= 1
+
+
+def build_replica_router():
+    urls = [url.strip() for url in settings.DATABASE_REPLICA_URLS.split(",")]
+    urls = [url for url in urls if url]
+    if not urls:
+        return None
+    engines = []
+    for index, url in enumerate(urls):
+        async_url = to_async_url(url)
+        engine = create_async_engine(
+            async_url, **pool_options(async_url, f"replica-{index}")
+        )
+        instrument_engine(engine)
+        engines.append(engine)
+    return ReplicaRouter(engines, settings.DATABASE_REPLICA_STRATEGY)
+
+
+replica_router = build_replica_router()
+
+
+def pinned_to_primary(request: Request) -> bool:
+    try:
+        return float(request.cookies.get(PRIMARY_PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def served_by_replica(db: AsyncSession) -> bool:
+    """Whether ``db`` reads from a replica, whose rows may lag the primary.
+
+    Such rows must not go into the shared todo cache, where clients pinned to
+    the primary (or other workers) would be served them.
+    """
+    return db.info.get("replica", False)
+
+
+async def get_read_db(request: Request, db: AsyncSession = Depends(get_db)):
+    """Session for read-only handlers: a replica unless pinned to the primary.
+
+    The primary session is opened lazily, so it costs no connection when a
+    replica serves the request.
+    """
+    if replica_router is None or pinned_to_primary(request):
+        yield db
+        return
+    async with replica_router.session() as replica_db:
+        yield replica_db
+
+
+class PrimaryPinMiddleware:
+    """ASGI middleware that pins a client to the primary after it writes."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] in SAFE_METHODS
+            or replica_router is None
+            or settings.READ_YOUR_WRITES_SECONDS <= 0
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_pin(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                seconds = settings.READ_YOUR_WRITES_SECONDS
+                MutableHeaders(scope=message).append(
+                    "set-cookie",
+                    f"{PRIMARY_PIN_COOKIE}={time.time() + seconds:.0f}; "
+                    f"Max-Age={seconds}; Path=/; HttpOnly; SameSite=lax",
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_with_pin)
@@ -1,36 +1,78 @@
 from typing import Annotated
 
-from sqlalchemy.orm import Session
-from fastapi import APIRouter, Depends, HTTPException, Path
+from pydantic import Field
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Response
+from fastapi.responses import StreamingResponse
 from starlette import status
 
 from models import Todos
-from database import SessionLocal
+from cache import todo_cache
+from database import get_db, get_sessionmaker
+from replicas import get_read_db
+from export import export_response
+from mutations import delete_one
+from pagination import set_next_cursor
+from queries import rows_to_dicts, select_todos
 from .auth import get_current_user
+from .todos import (
+    TodoListParams,
+    TodoResponse,
+    bump_list_version,
+    export_columns,
+    export_format_query,
+    list_todos,
+)
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+db_dependency = Annotated[AsyncSession, Depends(get_db)]
+read_db_dependency = Annotated[AsyncSession, Depends(get_read_db)]
+session_factory_dependency = Annotated[async_sessionmaker, Depends(get_sessionmaker)]
+user_dependency = Annotated[dict, Depends(get_current_user)]
 
 
-db_dependency = Annotated[Session, Depends(get_db)]
-user_dependency = Annotated[dict, Depends(get_current_user)]
+class AdminTodoListParams(TodoListParams):
+    owner_id: int | None = Field(default=None, gt=0)
 
 
-@router.get("/todo", status_code=status.HTTP_200_OK)
-async def read_all(user: user_dependency, db: db_dependency):
+@router.get(
+    "/todo", status_code=status.HTTP_200_OK, response_model=list[TodoResponse]
+)
+async def read_all(
+    user: user_dependency,
+    db: read_db_dependency,
+    params: Annotated[AdminTodoListParams, Query()],
+    response: Response,
+):
     if user is None or user.get("user_role") != "admin":
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Authentication Failed.",
         )
-    return db.query(Todos).all()
+    stmt = select_todos()
+    if params.owner_id is not None:
+        stmt = stmt.where(Todos.owner_id == params.owner_id)
+    page, cursor = await list_todos(db, stmt, params)
+    set_next_cursor(response, cursor)
+    return rows_to_dicts(page)
+
+
+@router.get(
+    "/todo/export", status_code=status.HTTP_200_OK, response_class=StreamingResponse
+)
+async def export_todos(
+    user: user_dependency,
+    session_factory: session_factory_dependency,
+    export_format: str = export_format_query,
+):
+    if user is None or user.get("user_role") != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Authentication Failed.",
+        )
+    return export_response(session_factory, export_columns(), export_format, "todos")
 
 
 @router.delete("/todo/{todo_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -44,11 +86,9 @@ async def delete_todo(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Authentication Failed.",
         )
-    todo_model = db.query(Todos).filter(Todos.id == todo_id).first()
-    if todo_model is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Todo not found.",
-        )
-    db.query(Todos).filter(Todos.id == todo_id).delete()
-    db.commit()
+    deleted = await delete_one(
+        db, Todos, [Todos.id == todo_id], [Todos.owner_id], "Todo not found."
+    )
+    await bump_list_version(db, deleted.owner_id)
+    await db.commit()
+    await todo_cache.invalidate(deleted.owner_id, todo_id)
@@ -1,23 +1,26 @@
 from datetime import timedelta, datetime, timezone
 from typing import Annotated
+from uuid import uuid4
 
 from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import HTMLResponse
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
-from database import SessionLocal
-from models import Users
-from passlib.context import CryptContext
+from database import get_db
+from models import RefreshTokens, Users
+from passwords import bcrypt_context, password_hasher
+from token_cache import token_cache
 from config import settings
 
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
 from jose import jwt, JWTError
-from fastapi.templating import Jinja2Templates
+from rendering import templates
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
-bcrypt_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_bearer = OAuth2PasswordBearer(tokenUrl="auth/token")
 
 
@@ -34,29 +37,24 @@ class CreateUserRequest(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: str | None = None
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
-db_dependency = Annotated[Session, Depends(get_db)]
 
-templates = Jinja2Templates(directory="templates")
+db_dependency = Annotated[AsyncSession, Depends(get_db)]
 
 ### Pages ###
 
 
-@router.get("/login-page")
+@router.get("/login-page", response_class=HTMLResponse)
 def render_login_page(request: Request):
     return templates.TemplateResponse("login.html", {"request": request})
 
 
-@router.get("/register-page")
+@router.get("/register-page", response_class=HTMLResponse)
 def render_register_page(request: Request):
     return templates.TemplateResponse("register.html", {"request": request})
 
@@ -64,11 +62,11 @@ def render_register_page(request: Request):
 ### Endpoints ###
 
 
-def authenticate_user(username: str, password: str, db):
-    user = db.query(Users).filter(Users.username == username).first()
+async def authenticate_user(username: str, password: str, db):
+    user = await db.scalar(select(Users).where(Users.username == username))
     if not user:
         return False
-    if not bcrypt_context.verify(password, user.hashed_password):
+    if not await password_hasher.verify(password, user.hashed_password):
         return False
     return user
 
@@ -82,7 +80,96 @@ def create_access_token(
     return jwt.encode(encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
 
 
+async def create_refresh_token(
+    db, user_id: int, family_id: str | None = None, expires: datetime | None = None
+):
+    """Issue a refresh token and record it in the revocation store.
+
+    A new family (a login) expires REFRESH_TOKEN_EXPIRE_DAYS from now; tokens
+    rotated within a family keep its ``expires``, so refreshing never extends
+    a login. The caller commits; the token is only usable once the row is
+    committed.
+    """
+    jti = uuid4().hex
+    family_id = family_id or uuid4().hex
+    if expires is None:
+        expires = datetime.now(timezone.utc) + timedelta(
+            days=settings.REFRESH_TOKEN_EXPIRE_DAYS
+        )
+    elif expires.tzinfo is None:
+        # SQLite hands back naive datetimes; they are stored in UTC.
+        expires = expires.replace(tzinfo=timezone.utc)
+    db.add(
+        RefreshTokens(
+            jti=jti, family_id=family_id, user_id=user_id, expires_at=expires
+        )
+    )
+    encode = {"id": user_id, "jti": jti, "type": "refresh", "exp": expires}
+    return jwt.encode(encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+
+def decode_refresh_token(token: str) -> dict:
+    try:
+        payload = jwt.decode(
+            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+        )
+    except JWTError:
+        payload = {}
+    if payload.get("type") != "refresh" or payload.get("jti") is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate refresh token.",
+        )
+    return payload
+
+
+async def revoke_refresh_family(db, family_id: str):
+    await db.execute(
+        update(RefreshTokens)
+        .where(RefreshTokens.family_id == family_id)
+        .values(revoked=True)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def revoke_user_refresh_tokens(db, user_id: int):
+    """Revoke every refresh token of ``user_id``, e.g. on a password change."""
+    await db.execute(
+        update(RefreshTokens)
+        .where(RefreshTokens.user_id == user_id)
+        .values(revoked=True)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def purge_refresh_tokens(db, user_id: int):
+    """Delete the user's expired tokens and families with no live token left.
+
+    Rotated tokens of a live family are kept until they expire, so presenting
+    one again is still caught as reuse. Run before issuing tokens: rows added
+    to the session but not flushed do not count as live.
+    """
+    live_families = select(RefreshTokens.family_id).where(
+        RefreshTokens.user_id == user_id, RefreshTokens.revoked.is_(False)
+    )
+    await db.execute(
+        delete(RefreshTokens)
+        .where(RefreshTokens.user_id == user_id)
+        .where(
+            or_(
+                RefreshTokens.expires_at <= datetime.now(timezone.utc),
+                RefreshTokens.family_id.not_in(live_families),
+            )
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
 async def get_current_user(token: Annotated[str, Depends(oauth2_bearer)]):
+    if isinstance(token, str):
+        claims = token_cache.get(token)
+        if claims is not None:
+            return dict(claims)
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
@@ -90,12 +177,14 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_bearer)]):
         username: str = payload.get("sub")
         user_id: int = payload.get("id")
         user_role: str = payload.get("role")
-        if username is None or user_id is None:
+        if username is None or user_id is None or payload.get("type") == "refresh":
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Could not validate user.",
             )
-        return {"username": username, "id": user_id, "user_role": user_role}
+        claims = {"username": username, "id": user_id, "user_role": user_role}
+        token_cache.put(token, claims, payload.get("exp"))
+        return dict(claims)
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate user."
@@ -110,13 +199,13 @@ async def create_user(db: db_dependency, create_user_request: CreateUserRequest)
         first_name=create_user_request.first_name,
         last_name=create_user_request.last_name,
         role=create_user_request.role,
-        hashed_password=bcrypt_context.hash(create_user_request.password),
+        hashed_password=await password_hasher.hash(create_user_request.password),
         is_active=True,
         phone_number=create_user_request.phone_number,
     )
 
     db.add(create_user_model)
-    db.commit()
+    await db.commit()
 
 
 @router.post("/token", response_model=Token)
@@ -124,7 +213,7 @@ async def login_for_access_token(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
     db: db_dependency,
 ):
-    user = authenticate_user(form_data.username, form_data.password, db)
+    user = await authenticate_user(form_data.username, form_data.password, db)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -136,5 +225,87 @@ async def login_for_access_token(
         user.role,
         timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
     )
+    await purge_refresh_tokens(db, user.id)
+    refresh_token = await create_refresh_token(db, user.id)
+    await db.commit()
+
+    return {
+        "access_token": token,
+        "token_type": "bearer",
+        "refresh_token": refresh_token,
+    }
+
+
+@router.post("/refresh", response_model=Token)
+async def refresh_access_token(db: db_dependency, refresh_request: RefreshRequest):
+    """Exchange a refresh token for a new access/refresh pair.
+
+    Costs one signature check and indexed lookups instead of a bcrypt verify.
+    Each refresh token is single-use: presenting a rotated token again is
+    treated as theft and revokes every token from that login.
+    """
+    payload = decode_refresh_token(refresh_request.refresh_token)
+    await purge_refresh_tokens(db, payload["id"])
+    row = (
+        await db.execute(
+            select(
+                RefreshTokens.family_id,
+                RefreshTokens.expires_at,
+                Users.username,
+                Users.id,
+                Users.role,
+            )
+            .join(Users, Users.id == RefreshTokens.user_id)
+            .where(RefreshTokens.jti == payload["jti"])
+        )
+    ).first()
+    if row is None:
+        await db.commit()
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate refresh token.",
+        )
 
-    return {"access_token": token, "token_type": "bearer"}
+    # Conditional update so two concurrent refreshes cannot both succeed.
+    rotated = await db.execute(
+        update(RefreshTokens)
+        .where(RefreshTokens.jti == payload["jti"])
+        .where(RefreshTokens.revoked.is_(False))
+        .values(revoked=True)
+        .execution_options(synchronize_session=False)
+    )
+    if rotated.rowcount == 0:
+        await revoke_refresh_family(db, row.family_id)
+        await db.commit()
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate refresh token.",
+        )
+
+    token = create_access_token(
+        row.username,
+        row.id,
+        row.role,
+        timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
+    )
+    refresh_token = await create_refresh_token(
+        db, row.id, row.family_id, row.expires_at
+    )
+    await db.commit()
+
+    return {
+        "access_token": token,
+        "token_type": "bearer",
+        "refresh_token": refresh_token,
+    }
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def revoke_refresh_token(db: db_dependency, refresh_request: RefreshRequest):
+    payload = decode_refresh_token(refresh_request.refresh_token)
+    family_id = await db.scalar(
+        select(RefreshTokens.family_id).where(RefreshTokens.jti == payload["jti"])
+    )
+    if family_id is not None:
+        await revoke_refresh_family(db, family_id)
+        await db.commit()
@@ -1,35 +1,65 @@
-from typing import Annotated
-
-from pydantic import BaseModel, Field
-from sqlalchemy.orm import Session
-from fastapi import APIRouter, Depends, HTTPException, Path, Request
+import logging
+from typing import Annotated, Literal
+
+from pydantic import BaseModel, ConfigDict, Field
+from sqlalchemy import case, delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Path,
+    Query,
+    Request,
+    Response,
+)
+from markupsafe import Markup
 from starlette import status
 
-from models import Todos
-from database import SessionLocal
+from models import Todos, Users
+from cache import todo_cache
+from database import get_db, get_sessionmaker
+from replicas import get_read_db, served_by_replica
+from etags import (
+    etag_matches,
+    if_match_versions,
+    list_etag,
+    not_modified,
+    precondition_failed,
+    todo_etag,
+)
+from mutations import delete_one, update_one
+from export import export_response
+from bulk_import import MEDIA_TYPE_FORMATS, import_todos as run_import
+from queries import fetch_rows, rows_to_dicts, select_todos
+from search import search_terms, search_todos
+from pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    next_cursor,
+    paginate,
+    set_next_cursor,
+)
 from .auth import get_current_user
 
-from starlette.responses import RedirectResponse
-from fastapi.templating import Jinja2Templates
+from rendering import StreamedFragment, stream_template, templates
+from starlette.background import BackgroundTask
+from starlette.responses import HTMLResponse, RedirectResponse, StreamingResponse
 
+logger = logging.getLogger(__name__)
 
-templates = Jinja2Templates(directory="templates")
 router = APIRouter(
     prefix="/todos",
     tags=["todos"],
 )
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
-db_dependency = Annotated[Session, Depends(get_db)]
+db_dependency = Annotated[AsyncSession, Depends(get_db)]
+read_db_dependency = Annotated[AsyncSession, Depends(get_read_db)]
+session_factory_dependency = Annotated[async_sessionmaker, Depends(get_sessionmaker)]
 user_dependency = Annotated[dict, Depends(get_current_user)]
+export_format_query = Query(default="ndjson", alias="format", pattern="^(ndjson|csv)$")
 
 
 class TodoRequest(BaseModel):
@@ -39,6 +69,122 @@ class TodoRequest(BaseModel):
     complete: bool
 
 
+class TodoResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    title: str | None
+    description: str | None
+    priority: int | None
+    complete: bool | None
+    owner_id: int | None
+
+
+class TodoListParams(BaseModel):
+    complete: bool | None = None
+    priority_min: int | None = Field(default=None, gt=0, lt=6)
+    priority_max: int | None = Field(default=None, gt=0, lt=6)
+    sort: Literal["id", "-id", "priority", "-priority"] = "id"
+    cursor: str | None = None
+    limit: int = Field(default=DEFAULT_PAGE_SIZE, gt=0, le=MAX_PAGE_SIZE)
+
+
+list_params_dependency = Annotated[TodoListParams, Query()]
+
+MAX_BATCH_SIZE = 500
+
+
+class TodoBatchUpdate(TodoRequest):
+    id: int = Field(gt=0)
+
+
+class TodoBatchRequest(BaseModel):
+    create: list[TodoRequest] = Field(default_factory=list, max_length=MAX_BATCH_SIZE)
+    update: list[TodoBatchUpdate] = Field(
+        default_factory=list, max_length=MAX_BATCH_SIZE
+    )
+    delete: list[Annotated[int, Field(gt=0)]] = Field(
+        default_factory=list, max_length=MAX_BATCH_SIZE
+    )
+
+
+class TodoImportError(BaseModel):
+    line: int | None
+    detail: str
+
+
+class TodoImportResponse(BaseModel):
+    inserted: int
+    failed: int
+    errors: list[TodoImportError]
+
+
+class TodoBatchItemResult(BaseModel):
+    index: int
+    id: int | None
+    status: int
+
+
+class TodoBatchResponse(BaseModel):
+    create: list[TodoBatchItemResult]
+    update: list[TodoBatchItemResult]
+    delete: list[TodoBatchItemResult]
+
+
+def filter_todos(stmt, params: TodoListParams):
+    if params.complete is not None:
+        stmt = stmt.where(Todos.complete == params.complete)
+    if params.priority_min is not None:
+        stmt = stmt.where(Todos.priority >= params.priority_min)
+    if params.priority_max is not None:
+        stmt = stmt.where(Todos.priority <= params.priority_max)
+    return stmt
+
+
+async def list_todos(db, stmt, params: TodoListParams):
+    """Run a keyset-paginated listing over a ``select_todos()`` statement,
+    returning ``(rows, next_cursor)``."""
+    stmt = paginate(
+        filter_todos(stmt, params), Todos, params.sort, params.cursor, params.limit
+    )
+    rows = await fetch_rows(db, stmt)
+    return next_cursor(rows, Todos, params.sort, params.limit)
+
+
+async def bump_list_version(db, owner_id: int):
+    """Invalidate list ETags for ``owner_id``; call inside the write's transaction."""
+    await db.execute(
+        update(Users)
+        .where(Users.id == owner_id)
+        .values(todo_list_version=Users.todo_list_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def todo_criteria(todo_id: int, owner_id: int, if_match: str | None):
+    """WHERE clauses for a single-statement write to one of the owner's todos."""
+    criteria = [Todos.id == todo_id, Todos.owner_id == owner_id]
+    versions = if_match_versions(if_match, todo_id)
+    if versions is not None:
+        criteria.append(Todos.version.in_(versions))
+    return criteria
+
+
+async def raise_for_failed_precondition(db, todo_id, owner_id, if_match):
+    """After a conditional write matched nothing, tell 412 apart from 404."""
+    if if_match is None:
+        return
+    exists = await db.scalar(
+        select(Todos.id).where(Todos.id == todo_id).where(Todos.owner_id == owner_id)
+    )
+    if exists is not None:
+        raise precondition_failed()
+
+
+def export_columns():
+    return select_todos().order_by(Todos.id)
+
+
 def redirect_to_login():
     redirect_response = RedirectResponse(
         url="/auth/login-page", status_code=status.HTTP_302_FOUND
@@ -50,22 +196,45 @@ def redirect_to_login():
 ## Pages ##
 
 
-@router.get("/todo-page")
-async def render_todos_page(request: Request, db: db_dependency):
+@router.get("/todo-page", response_class=HTMLResponse)
+async def render_todos_page(request: Request, db: read_db_dependency):
     try:
         user = await get_current_user(request.cookies.get("access_token"))
         if user is None:
             return redirect_to_login()
 
-        todos = db.query(Todos).filter(Todos.owner_id == user.get("id")).all()
+        cache_key = await todo_cache.fragment_key(user.get("id"), "todo-rows")
+        cached = await todo_cache.get_fragment(cache_key)
+        if cached is not None:
+            return stream_template(
+                "todo.html",
+                {"request": request, "rows": [Markup(cached)], "user": user},
+            )
+
+        todos = rows_to_dicts(
+            await fetch_rows(
+                db,
+                select_todos()
+                .where(Todos.owner_id == user.get("id"))
+                .order_by(Todos.id),
+            )
+        )
+        # The rows render as the page streams; the cache is filled afterwards.
+        rows = StreamedFragment("todo-rows.html", todos=todos)
+
+        async def cache_rows():
+            if rows.html is not None and not served_by_replica(db):
+                await todo_cache.set_fragment(cache_key, rows.html)
 
-        return templates.TemplateResponse(
-            "todo.html", {"request": request, "todos": todos, "user": user}
+        return stream_template(
+            "todo.html",
+            {"request": request, "rows": rows, "user": user},
+            background=BackgroundTask(cache_rows),
         )
     except HTTPException as e:
         return redirect_to_login()
 
-@router.get("/add-todo-page")
+@router.get("/add-todo-page", response_class=HTMLResponse)
 async def render_add_todo_page(request: Request):
     try:
         user = await get_current_user(request.cookies.get("access_token"))
@@ -77,14 +246,16 @@ async def render_add_todo_page(request: Request):
     except HTTPException as e:
         return redirect_to_login()
 
-@router.get("/edit-todo-page/{todo_id}")
-async def render_edit_todo_page(request: Request, todo_id: int, db: db_dependency):
+@router.get("/edit-todo-page/{todo_id}", response_class=HTMLResponse)
+async def render_edit_todo_page(
+    request: Request, todo_id: int, db: read_db_dependency
+):
     try:
         user = await get_current_user(request.cookies.get("access_token"))
         if user is None:
             return redirect_to_login()
         
-        todo = db.query(Todos).filter(Todos.id == todo_id).first()
+        todo = await db.scalar(select(Todos).where(Todos.id == todo_id))
         
         return templates.TemplateResponse("edit-todo.html", {"request": request, "todo": todo, "user": user})
     except HTTPException as e:
@@ -93,35 +264,197 @@ async def render_edit_todo_page(request: Request, todo_id: int, db: db_dependenc
 ## Endpoints ##
 
 
-@router.get("/", status_code=status.HTTP_200_OK)
-async def read_all(user: user_dependency, db: db_dependency):
+@router.get(
+    "/", status_code=status.HTTP_200_OK, response_model=list[TodoResponse]
+)
+async def read_all(
+    user: user_dependency,
+    db: read_db_dependency,
+    params: list_params_dependency,
+    response: Response,
+    if_none_match: str | None = Header(default=None),
+):
+    if user is None:
+        raise HTTPException(
+            status_code=401,
+            detail="Authentication failed.",
+        )
+    variant = params.model_dump()
+    cache_key = await todo_cache.list_key(user.get("id"), variant)
+    cached = await todo_cache.get_list(cache_key)
+    if cached is None:
+        # Only the owner's list version is needed to answer a conditional GET.
+        list_version = await db.scalar(
+            select(Users.todo_list_version).where(Users.id == user.get("id"))
+        )
+        etag = None
+        if list_version is not None:
+            etag = list_etag(user.get("id"), list_version, variant)
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
+        page, cursor = await list_todos(
+            db, select_todos().where(Todos.owner_id == user.get("id")), params
+        )
+        cached = {
+            "items": rows_to_dicts(page),
+            "cursor": cursor,
+            "etag": etag,
+        }
+        if not served_by_replica(db):
+            await todo_cache.set_list(cache_key, cached)
+    elif etag_matches(if_none_match, cached["etag"]):
+        return not_modified(cached["etag"])
+    if cached["etag"] is not None:
+        response.headers["ETag"] = cached["etag"]
+    set_next_cursor(response, cached["cursor"])
+    return cached["items"]
+
+
+@router.get(
+    "/search", status_code=status.HTTP_200_OK, response_model=list[TodoResponse]
+)
+async def search(
+    user: user_dependency,
+    db: read_db_dependency,
+    q: str = Query(min_length=1, max_length=200),
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, gt=0, le=MAX_PAGE_SIZE),
+):
+    """The owner's todos matching every word of ``q`` (as a prefix) in the
+    title or description, best matches first."""
+    if user is None:
+        raise HTTPException(
+            status_code=401,
+            detail="Authentication failed.",
+        )
+    terms = search_terms(q)
+    if not terms:
+        return []
+    try:
+        stmt = search_todos(db.get_bind().dialect.name, user.get("id"), terms, limit)
+    except NotImplementedError:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Search is not available on this database.",
+        )
+    return rows_to_dicts(await fetch_rows(db, stmt))
+
+
+@router.get(
+    "/export", status_code=status.HTTP_200_OK, response_class=StreamingResponse
+)
+async def export_todos(
+    user: user_dependency,
+    session_factory: session_factory_dependency,
+    export_format: str = export_format_query,
+):
     if user is None:
         raise HTTPException(
             status_code=401,
             detail="Authentication failed.",
         )
-    return db.query(Todos).filter(Todos.owner_id == user.get("id")).all()
+    return export_response(
+        session_factory,
+        export_columns().where(Todos.owner_id == user.get("id")),
+        export_format,
+        "todos",
+    )
 
 
-@router.get("/todo/{todo_id}", status_code=status.HTTP_200_OK)
-async def read_todo(
+@router.post(
+    "/import", status_code=status.HTTP_200_OK, response_model=TodoImportResponse
+)
+async def import_todos(
     user: user_dependency,
     db: db_dependency,
+    request: Request,
+    import_format: str | None = Query(
+        default=None, alias="format", pattern="^(ndjson|csv)$"
+    ),
+):
+    """Import todos from an NDJSON or CSV request body.
+
+    The body is read incrementally and every line is validated like a
+    ``POST /todos/todo`` payload; invalid lines are reported, not fatal.
+    """
+    if user is None:
+        raise HTTPException(
+            status_code=401,
+            detail="Authentication failed.",
+        )
+    if import_format is None:
+        content_type = request.headers.get("content-type", "").split(";")[0].strip()
+        import_format = MEDIA_TYPE_FORMATS.get(content_type)
+        if import_format is None:
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail="Unsupported import format.",
+            )
+    try:
+        report = await run_import(
+            db, request.stream(), import_format, user.get("id"), TodoRequest
+        )
+    except Exception:
+        # Chunks committed before the failure stay; only the current one is
+        # discarded, so the list version is still bumped for them. A failure
+        # there must not hide the import's own error.
+        await db.rollback()
+        try:
+            await bump_list_version(db, user.get("id"))
+            await db.commit()
+            await todo_cache.invalidate(user.get("id"))
+        except Exception:
+            logger.exception("Could not bump the list version after a failed import")
+        raise
+    await bump_list_version(db, user.get("id"))
+    await db.commit()
+    await todo_cache.invalidate(user.get("id"))
+    return report
+
+
+@router.get(
+    "/todo/{todo_id}", status_code=status.HTTP_200_OK, response_model=TodoResponse
+)
+async def read_todo(
+    user: user_dependency,
+    db: read_db_dependency,
+    response: Response,
     todo_id: int = Path(gt=0),
+    if_none_match: str | None = Header(default=None),
 ):
     if user is None:
         raise HTTPException(
             status_code=401,
             detail="Authentication failed.",
         )
-    todo_model = (
-        db.query(Todos)
-        .filter(Todos.id == todo_id)
-        .filter(Todos.owner_id == user.get("id"))
-        .first()
-    )
-    if todo_model is not None:
-        return todo_model
+    cached = await todo_cache.get_todo(user.get("id"), todo_id)
+    if cached is None and if_none_match is not None:
+        version = await db.scalar(
+            select(Todos.version)
+            .where(Todos.id == todo_id)
+            .where(Todos.owner_id == user.get("id"))
+        )
+        if version is not None and etag_matches(
+            if_none_match, todo_etag(todo_id, version)
+        ):
+            return not_modified(todo_etag(todo_id, version))
+    if cached is None:
+        rows = await fetch_rows(
+            db,
+            select_todos(Todos.version)
+            .where(Todos.id == todo_id)
+            .where(Todos.owner_id == user.get("id")),
+        )
+        if rows:
+            todo = rows[0]._asdict()
+            cached = {"todo": todo, "version": todo.pop("version")}
+            if not served_by_replica(db):
+                await todo_cache.set_todo(user.get("id"), todo_id, cached)
+    if cached is not None:
+        etag = todo_etag(todo_id, cached["version"])
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        response.headers["ETag"] = etag
+        return cached["todo"]
     raise HTTPException(
         status_code=404,
         detail="Todo not found.",
@@ -145,7 +478,9 @@ async def create_todo(
     )
 
     db.add(todo_model)
-    db.commit()
+    await bump_list_version(db, user.get("id"))
+    await db.commit()
+    await todo_cache.invalidate(user.get("id"))
 
 
 @router.put("/todo/{todo_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -153,7 +488,9 @@ async def update_todo(
     user: user_dependency,
     db: db_dependency,
     todo_request: TodoRequest,
+    response: Response,
     todo_id: int = Path(gt=0),
+    if_match: str | None = Header(default=None),
 ):
     if user is None:
         raise HTTPException(
@@ -161,25 +498,24 @@ async def update_todo(
             detail="Authentication failed.",
         )
 
-    todo_model = (
-        db.query(Todos)
-        .filter(Todos.id == todo_id)
-        .filter(Todos.owner_id == user.get("id"))
-        .first()
-    )
-    if todo_model is None:
-        raise HTTPException(
-            status_code=404,
-            detail="Todo not found.",
+    criteria = todo_criteria(todo_id, user.get("id"), if_match)
+    try:
+        row = await update_one(
+            db,
+            Todos,
+            criteria,
+            {**todo_request.model_dump(), "version": Todos.version + 1},
+            [Todos.version],
+            "Todo not found.",
         )
+    except HTTPException:
+        await raise_for_failed_precondition(db, todo_id, user.get("id"), if_match)
+        raise
+    await bump_list_version(db, user.get("id"))
 
-    todo_model.title = todo_request.title
-    todo_model.description = todo_request.description
-    todo_model.priority = todo_request.priority
-    todo_model.complete = todo_request.complete
-
-    db.add(todo_model)
-    db.commit()
+    await db.commit()
+    await todo_cache.invalidate(user.get("id"), todo_id)
+    response.headers["ETag"] = todo_etag(todo_id, row.version)
 
 
 @router.delete("/todo/{todo_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -187,25 +523,122 @@ async def delete_todo(
     user: user_dependency,
     db: db_dependency,
     todo_id: int = Path(gt=0),
+    if_match: str | None = Header(default=None),
 ):
     if user is None:
         raise HTTPException(
             status_code=401,
             detail="Authentication failed.",
         )
-    todo_model = (
-        db.query(Todos)
-        .filter(Todos.id == todo_id)
-        .filter(Todos.owner_id == user.get("id"))
-        .first()
-    )
-    if todo_model is None:
+    criteria = todo_criteria(todo_id, user.get("id"), if_match)
+    try:
+        await delete_one(db, Todos, criteria, [Todos.id], "Todo not found.")
+    except HTTPException:
+        await raise_for_failed_precondition(db, todo_id, user.get("id"), if_match)
+        raise
+    await bump_list_version(db, user.get("id"))
+
+    await db.commit()
+    await todo_cache.invalidate(user.get("id"), todo_id)
+
+
+@router.post(
+    "/batch", status_code=status.HTTP_200_OK, response_model=TodoBatchResponse
+)
+async def batch_todos(
+    user: user_dependency,
+    db: db_dependency,
+    batch_request: TodoBatchRequest,
+):
+    """Apply many creates, updates and deletes in a single transaction.
+
+    Each operation type is one bulk statement with RETURNING; per-item status
+    codes report which rows were created (201), changed (204) or not found
+    (404).
+    """
+    if user is None:
         raise HTTPException(
-            status_code=404,
-            detail="Todo not found.",
+            status_code=401,
+            detail="Authentication failed.",
+        )
+    owner_id = user.get("id")
+
+    created_ids = []
+    if batch_request.create:
+        created_ids = (
+            await db.scalars(
+                insert(Todos).returning(Todos.id, sort_by_parameter_order=True),
+                [
+                    {**todo.model_dump(), "owner_id": owner_id}
+                    for todo in batch_request.create
+                ],
+            )
+        ).all()
+
+    updated_ids = set()
+    if batch_request.update:
+        ids = [todo.id for todo in batch_request.update]
+        values = {
+            field: case(
+                {todo.id: getattr(todo, field) for todo in batch_request.update},
+                value=Todos.id,
+            )
+            for field in TodoRequest.model_fields
+        }
+        updated_ids = set(
+            (
+                await db.scalars(
+                    update(Todos)
+                    .where(Todos.owner_id == owner_id)
+                    .where(Todos.id.in_(ids))
+                    .values(**values, version=Todos.version + 1)
+                    .returning(Todos.id)
+                    .execution_options(synchronize_session=False)
+                )
+            ).all()
+        )
+
+    deleted_ids = set()
+    if batch_request.delete:
+        deleted_ids = set(
+            (
+                await db.scalars(
+                    delete(Todos)
+                    .where(Todos.owner_id == owner_id)
+                    .where(Todos.id.in_(batch_request.delete))
+                    .returning(Todos.id)
+                    .execution_options(synchronize_session=False)
+                )
+            ).all()
         )
-    db.query(Todos).filter(Todos.id == todo_id).filter(
-        Todos.owner_id == user.get("id")
-    ).delete()
 
-    db.commit()
+    await bump_list_version(db, owner_id)
+    await db.commit()
+    await todo_cache.invalidate(owner_id, *updated_ids, *deleted_ids)
+
+    return {
+        "create": [
+            {"index": index, "id": todo_id, "status": status.HTTP_201_CREATED}
+            for index, todo_id in enumerate(created_ids)
+        ],
+        "update": [
+            {
+                "index": index,
+                "id": todo.id,
+                "status": status.HTTP_204_NO_CONTENT
+                if todo.id in updated_ids
+                else status.HTTP_404_NOT_FOUND,
+            }
+            for index, todo in enumerate(batch_request.update)
+        ],
+        "delete": [
+            {
+                "index": index,
+                "id": todo_id,
+                "status": status.HTTP_204_NO_CONTENT
+                if todo_id in deleted_ids
+                else status.HTTP_404_NOT_FOUND,
+            }
+            for index, todo_id in enumerate(batch_request.delete)
+        ],
+    }
@@ -1,29 +1,37 @@
 from typing import Annotated
 
-from pydantic import BaseModel, Field
-from sqlalchemy.orm import Session
+from pydantic import BaseModel, ConfigDict, Field
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import APIRouter, Depends, HTTPException, Path
 from starlette import status
 
 from models import *
-from database import SessionLocal
-from .auth import get_current_user
-from passlib.context import CryptContext
+from database import get_db
+from replicas import get_read_db
+from .auth import get_current_user, revoke_user_refresh_tokens
+from mutations import update_one
+from passwords import password_hasher
 
 router = APIRouter(prefix="/user", tags=["user"])
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+db_dependency = Annotated[AsyncSession, Depends(get_db)]
+read_db_dependency = Annotated[AsyncSession, Depends(get_read_db)]
+user_dependency = Annotated[dict, Depends(get_current_user)]
 
 
-db_dependency = Annotated[Session, Depends(get_db)]
-user_dependency = Annotated[dict, Depends(get_current_user)]
-bcrypt_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+class UserResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    email: str | None
+    username: str | None
+    first_name: str | None
+    last_name: str | None
+    is_active: bool | None
+    role: str | None
+    phone_number: str | None
 
 
 class UserVerification(BaseModel):
@@ -31,13 +39,18 @@ class UserVerification(BaseModel):
     new_password: str = Field(min_length=6)
 
 
-@router.get("/", status_code=status.HTTP_200_OK)
-async def get_users(user: user_dependency, db: db_dependency):
+@router.get("/", status_code=status.HTTP_200_OK, response_model=UserResponse)
+async def get_users(user: user_dependency, db: read_db_dependency):
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentication Failed."
         )
-    return db.query(Users).filter(Users.id == user.get("id")).first()
+    user_model = await db.scalar(select(Users).where(Users.id == user.get("id")))
+    if user_model is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="User not found."
+        )
+    return user_model
 
 
 @router.put("/password", status_code=status.HTTP_204_NO_CONTENT)
@@ -48,15 +61,35 @@ async def change_password(
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentication Failed."
         )
-    user_model = db.query(Users).filter(Users.id == user.get("id")).first()
+    hashed_password = await db.scalar(
+        select(Users.hashed_password).where(Users.id == user.get("id"))
+    )
 
-    if not bcrypt_context.verify(user_verfication.password, user_model.hashed_password):
+    if hashed_password is None or not await password_hasher.verify(
+        user_verfication.password, hashed_password
+    ):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Error on password change."
         )
-    user_model.hashed_password = bcrypt_context.hash(user_verfication.new_password)
-    db.add(user_model)
-    db.commit()
+    # Conditional on the hash we verified, so a concurrent change wins cleanly
+    # and this request is told it lost rather than that the user is gone.
+    await update_one(
+        db,
+        Users,
+        [Users.id == user.get("id"), Users.hashed_password == hashed_password],
+        {
+            "hashed_password": await password_hasher.hash(
+                user_verfication.new_password
+            )
+        },
+        [Users.id],
+        "Password was changed concurrently.",
+        status.HTTP_409_CONFLICT,
+    )
+    # Sign out every session: refresh tokens issued before the change,
+    # possibly to whoever knew the old password, stop working with it.
+    await revoke_user_refresh_tokens(db, user.get("id"))
+    await db.commit()
 
 
 @router.put("/phonenumber/{phone_number}", status_code=status.HTTP_204_NO_CONTENT)
@@ -67,7 +100,12 @@ async def change_phone_number(
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentication Failed."
         )
-    user_model = db.query(Users).filter(Users.id == user.get("id")).first()
-    user_model.phone_number = phone_number
-    db.add(user_model)
-    db.commit()
+    await update_one(
+        db,
+        Users,
+        [Users.id == user.get("id")],
+        {"phone_number": phone_number},
+        [Users.id],
+        "User not found.",
+    )
+    await db.commit()
@@ -0,0 +1,146 @@
+"""Full-text search over todo titles and descriptions.
+
+PostgreSQL keeps a weighted ``tsvector`` in ``todos.search_vector`` (title
+ranks above description), maintained by a trigger and indexed with GIN
+together with ``owner_id``, so a search only touches the owner's entries.
+SQLite uses an external-content FTS5 table, ``todos_fts``, kept in sync by
+triggers; it has no owner column, so the owner filter runs after the match
+and cost grows with every user's matches. The Alembic migration creates
+both; ``install_search_index`` does the same for databases created through
+``create_all`` (development, tests).
+
+Neither the column nor the FTS table is mapped on ``Todos``; they are only
+read through the statements built here.
+"""
+
+import re
+
+from sqlalchemy import column, func, inspect, literal_column, select, table, text
+
+from models import Todos
+from queries import select_todos
+
+MAX_TERMS = 8
+TERM = re.compile(r"\w+")
+
+POSTGRES_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS btree_gin",
+    "ALTER TABLE todos ADD COLUMN IF NOT EXISTS search_vector tsvector",
+    """
+    CREATE OR REPLACE FUNCTION todos_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(NEW.description, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS todos_search_vector_update ON todos",
+    """
+    CREATE TRIGGER todos_search_vector_update
+    BEFORE INSERT OR UPDATE OF title, description ON todos
+    FOR EACH ROW EXECUTE FUNCTION todos_search_vector_update()
+    """,
+    """
+    UPDATE todos SET search_vector =
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'B')
+    WHERE search_vector IS NULL
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_todos_owner_id_search_vector
+    ON todos USING gin (owner_id, search_vector)
+    """,
+)
+
+SQLITE_DDL = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS todos_fts USING fts5(
+        title, description,
+        content='todos', content_rowid='id', tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS todos_fts_insert AFTER INSERT ON todos BEGIN
+        INSERT INTO todos_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS todos_fts_delete AFTER DELETE ON todos BEGIN
+        INSERT INTO todos_fts(todos_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS todos_fts_update
+    AFTER UPDATE OF title, description ON todos BEGIN
+        INSERT INTO todos_fts(todos_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO todos_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    "INSERT INTO todos_fts(todos_fts) VALUES ('rebuild')",
+)
+
+SEARCH_DDL = {"postgresql": POSTGRES_DDL, "sqlite": SQLITE_DDL}
+
+
+def search_index_installed(connection) -> bool:
+    inspector = inspect(connection)
+    if connection.dialect.name == "sqlite":
+        return inspector.has_table("todos_fts")
+    return "search_vector" in {c["name"] for c in inspector.get_columns("todos")}
+
+
+def install_search_index(connection):
+    """Create the search column/table, triggers and index, and index the
+    existing todos, unless already installed.
+
+    A no-op without a ``todos`` table or on databases without full-text
+    support here.
+    """
+    statements = SEARCH_DDL.get(connection.dialect.name)
+    if statements is None or not inspect(connection).has_table("todos"):
+        return
+    if search_index_installed(connection):
+        return
+    for statement in statements:
+        connection.execute(text(statement))
+
+
+def search_terms(query: str) -> list[str]:
+    """Words of a user query, lower-cased; anything else is dropped, so no
+    query syntax reaches the database."""
+    return [term.lower() for term in TERM.findall(query)][:MAX_TERMS]
+
+
+def search_todos(dialect: str, owner_id: int, terms: list[str], limit: int):
+    """Ranked select of the owner's todos matching every term as a prefix."""
+    if dialect == "postgresql":
+        search_vector = literal_column("todos.search_vector")
+        tsquery = func.to_tsquery("english", " & ".join(f"{t}:*" for t in terms))
+        rank = func.ts_rank(search_vector, tsquery)
+        return (
+            select_todos()
+            .where(Todos.owner_id == owner_id)
+            .where(search_vector.op("@@")(tsquery))
+            .order_by(rank.desc(), Todos.id)
+            .limit(limit)
+        )
+    if dialect == "sqlite":
+        todos_fts = table("todos_fts", column("rowid"))
+        match = " ".join(f'"{t}"*' for t in terms)
+        # bm25() is lower for better matches; title hits weigh double.
+        rank = func.bm25(literal_column("todos_fts"), 2.0, 1.0)
+        return (
+            select_todos()
+            .join(todos_fts, todos_fts.c.rowid == Todos.id)
+            .where(Todos.owner_id == owner_id)
+            .where(literal_column("todos_fts").match(match))
+            .order_by(rank, Todos.id)
+            .limit(limit)
+        )
+    raise NotImplementedError(f"Full-text search is not supported on {dialect}.")
@@ -1,10 +1,12 @@
 from .utils import *
-from routers.admin import get_db, get_current_user
+from routers.admin import get_db, get_current_user, get_sessionmaker
 from fastapi import status
 from models import Todos
 
 app.dependency_overrides[get_db] = override_get_db
 
+app.dependency_overrides[get_sessionmaker] = override_get_sessionmaker
+
 app.dependency_overrides[get_current_user] = override_current_user
 
 
@@ -36,3 +38,38 @@ def test_admin_delete_todo_not_found(test_todo):
     response = client.delete("/admin/todo/999999")
     assert response.status_code == status.HTTP_404_NOT_FOUND
     assert response.json() == {"detail": "Todo not found."}
+
+
+def test_admin_read_all_paginates(test_todo):
+    db = TestingSessionLocal()
+    db.add(
+        Todos(
+            title="Other owner",
+            description="Belongs to someone else",
+            priority=1,
+            complete=True,
+            owner_id=2,
+        )
+    )
+    db.commit()
+
+    response = client.get("/admin/todo", params={"limit": 1})
+    assert response.status_code == status.HTTP_200_OK
+    assert [todo["id"] for todo in response.json()] == [1]
+
+    response = client.get(
+        "/admin/todo", params={"limit": 1, "cursor": response.headers["X-Next-Cursor"]}
+    )
+    assert [todo["id"] for todo in response.json()] == [2]
+
+    response = client.get("/admin/todo", params={"owner_id": 2})
+    assert [todo["owner_id"] for todo in response.json()] == [2]
+
+
+def test_admin_export_todos(test_todo):
+    response = client.get("/admin/todo/export", params={"format": "csv"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.text.splitlines() == [
+        "id,title,description,priority,complete,owner_id",
+        "1,Learn to code!,Need to learn everyday!,5,False,1",
+    ]
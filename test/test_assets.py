@@ -0,0 +1,72 @@
+import gzip
+
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.routing import Mount
+
+import assets
+from assets import IMMUTABLE, PrecompressedStaticFiles, build_assets
+
+from .utils import *
+
+CSS = b"body { color: black; }\n" * 200
+
+
+@pytest.fixture
+def built(tmp_path):
+    source = tmp_path / "static"
+    (source / "css").mkdir(parents=True)
+    (source / "css" / "site.css").write_bytes(CSS)
+    (source / "js").mkdir()
+    (source / "js" / "app.js").write_bytes(b"run();\n//# sourceMappingURL=app.js.map\n")
+    (source / "js" / "app.js.map").write_bytes(b'{"version": 3}')
+    output = tmp_path / "build"
+    manifest = build_assets(str(source), str(output))
+    return output, manifest
+
+
+def test_build_writes_hashed_and_compressed_files(built):
+    output, manifest = built
+    hashed = manifest["css/site.css"]
+    assert hashed.startswith("css/site.") and hashed.endswith(".css")
+    assert (output / hashed).read_bytes() == CSS
+    assert gzip.decompress((output / (hashed + ".gz")).read_bytes()) == CSS
+    assert (output / "manifest.json").exists()
+
+
+def test_build_points_scripts_at_hashed_source_maps(built):
+    output, manifest = built
+    script = (output / manifest["js/app.js"]).read_bytes()
+    map_name = manifest["js/app.js.map"].removeprefix("js/")
+    assert script.endswith(f"sourceMappingURL={map_name}\n".encode())
+
+
+def test_precompressed_variant_negotiated(built):
+    output, manifest = built
+    static_client = TestClient(
+        Starlette(routes=[Mount("/assets", PrecompressedStaticFiles(directory=output))])
+    )
+    url = "/assets/" + manifest["css/site.css"]
+
+    response = static_client.get(url, headers={"Accept-Encoding": "gzip, br;q=0"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["content-type"].startswith("text/css")
+    assert int(response.headers["content-length"]) < len(CSS)
+    assert response.headers["cache-control"] == IMMUTABLE
+    assert response.content == CSS
+
+    response = static_client.get(url, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    assert response.headers["cache-control"] == IMMUTABLE
+    assert response.content == CSS
+
+
+def test_static_url_uses_manifest(monkeypatch):
+    assert "/static/css/base.css" in client.get("/auth/login-page").text
+
+    monkeypatch.setattr(
+        assets, "load_manifest", lambda: {"css/base.css": "css/base.0123abcd.css"}
+    )
+    page = client.get("/auth/login-page").text
+    assert "/assets/css/base.0123abcd.css" in page
+    assert "/static/js/base.js" in page
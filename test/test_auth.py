@@ -7,26 +7,35 @@ from routers.auth import (
 )
 
 from config import settings
+from models import RefreshTokens
+from passwords import PasswordHasher
+from token_cache import VerifiedTokenCache, token_cache
 from jose import jwt
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone
 import pytest
 from fastapi import HTTPException
 
 app.dependency_overrides[get_db] = override_get_db
 
 
-def test_authenticate_user(test_user):
-    db = TestingSessionLocal()
-
-    authenticated_user = authenticate_user(test_user.username, "testpassword", db)
-    assert authenticated_user is not None
-    assert authenticated_user.username == test_user.username
+@pytest.mark.asyncio
+async def test_authenticate_user(test_user):
+    async with TestingAsyncSessionLocal() as db:
+        authenticated_user = await authenticate_user(
+            test_user.username, "testpassword", db
+        )
+        assert authenticated_user is not None
+        assert authenticated_user.username == test_user.username
 
-    non_authenticated_user = authenticate_user("WrongUsername", "wrongpassword", db)
-    assert non_authenticated_user is False
+        non_authenticated_user = await authenticate_user(
+            "WrongUsername", "wrongpassword", db
+        )
+        assert non_authenticated_user is False
 
-    wrong_password_user = authenticate_user(test_user.username, "wrongpassword", db)
-    assert wrong_password_user is False
+        wrong_password_user = await authenticate_user(
+            test_user.username, "wrongpassword", db
+        )
+        assert wrong_password_user is False
 
 
 def test_create_access_token():
@@ -67,3 +76,169 @@ async def test_get_current_user_missing_payload():
 
     assert excinfo.value.status_code == 401
     assert excinfo.value.detail == "Could not validate user."
+
+
+@pytest.mark.asyncio
+async def test_password_hasher_round_trip():
+    hasher = PasswordHasher(executor="thread", max_workers=1)
+    try:
+        hashed = await hasher.hash("testpassword")
+        assert await hasher.verify("testpassword", hashed) is True
+        assert await hasher.verify("wrongpassword", hashed) is False
+    finally:
+        hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_password_hasher_process_pool():
+    hasher = PasswordHasher(executor="process", max_workers=1)
+    try:
+        hashed = await hasher.hash("testpassword")
+        assert await hasher.verify("testpassword", hashed) is True
+    finally:
+        hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_password_hasher_rejects_when_queue_full():
+    hasher = PasswordHasher(executor="thread", max_workers=1, max_queue=0)
+    with pytest.raises(HTTPException) as excinfo:
+        await hasher.hash("testpassword")
+
+    assert excinfo.value.status_code == 503
+
+
+@pytest.mark.asyncio
+async def test_get_current_user_uses_token_cache(monkeypatch):
+    token_cache.clear()
+    token = create_access_token("testuser", 1, "admin", timedelta(minutes=15))
+    assert (await get_current_user(token=token))["username"] == "testuser"
+
+    def fail_decode(*args, **kwargs):
+        raise AssertionError("token should have been served from the cache")
+
+    monkeypatch.setattr("routers.auth.jwt.decode", fail_decode)
+    user = await get_current_user(token=token)
+    assert user == {"username": "testuser", "id": 1, "user_role": "admin"}
+    token_cache.clear()
+
+
+def test_token_cache_never_serves_past_exp():
+    now = [1000.0]
+    cache = VerifiedTokenCache(max_entries=2, max_ttl=300, clock=lambda: now[0])
+    cache.put("token", {"id": 1}, exp=1010)
+    assert cache.get("token") == {"id": 1}
+
+    now[0] = 1010.0
+    assert cache.get("token") is None
+
+    cache.put("expired", {"id": 2}, exp=900)
+    assert cache.get("expired") is None
+
+
+def test_token_cache_is_bounded():
+    cache = VerifiedTokenCache(max_entries=1, max_ttl=300)
+    cache.put("first", {"id": 1})
+    cache.put("second", {"id": 2})
+    assert cache.get("first") is None
+    assert cache.get("second") == {"id": 2}
+
+
+def login(username="codingwithrobytest", password="testpassword"):
+    return client.post("/auth/token", data={"username": username, "password": password})
+
+
+def test_login_returns_refresh_token(test_user):
+    response = login()
+    assert response.status_code == 200
+    tokens = response.json()
+    assert tokens["token_type"] == "bearer"
+    assert tokens["refresh_token"]
+
+
+def test_refresh_rotates_tokens(test_user):
+    refresh_token = login().json()["refresh_token"]
+
+    response = client.post("/auth/refresh", json={"refresh_token": refresh_token})
+    assert response.status_code == 200
+    rotated = response.json()
+    assert rotated["refresh_token"] != refresh_token
+
+    decoded = jwt.decode(
+        rotated["access_token"], settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+    )
+    assert decoded["sub"] == test_user.username
+
+
+def test_refresh_keeps_the_login_expiry(test_user):
+    refresh_token = login().json()["refresh_token"]
+    login_expiry = datetime.now(timezone.utc).replace(microsecond=0) + timedelta(hours=1)
+    db = TestingSessionLocal()
+    db.query(RefreshTokens).update({RefreshTokens.expires_at: login_expiry})
+    db.commit()
+
+    rotated = client.post(
+        "/auth/refresh", json={"refresh_token": refresh_token}
+    ).json()["refresh_token"]
+    claims = jwt.decode(rotated, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    assert claims["exp"] == int(login_expiry.timestamp())
+
+
+def test_login_purges_expired_and_revoked_tokens(test_user):
+    logged_out = login().json()["refresh_token"]
+    client.post("/auth/logout", json={"refresh_token": logged_out})
+    live = login().json()["refresh_token"]
+    client.post("/auth/refresh", json={"refresh_token": live})
+    db = TestingSessionLocal()
+    db.add(
+        RefreshTokens(
+            jti="expired",
+            family_id="old-login",
+            user_id=test_user.id,
+            expires_at=datetime.now(timezone.utc) - timedelta(days=1),
+        )
+    )
+    db.commit()
+
+    login()
+
+    db = TestingSessionLocal()
+    rows = db.query(RefreshTokens).all()
+    # The live family keeps its rotated token (for reuse detection); the
+    # logged-out family and the expired token are gone.
+    assert len({row.family_id for row in rows}) == 2
+    assert "expired" not in {row.jti for row in rows}
+    assert len(rows) == 3
+
+
+def test_refresh_token_reuse_revokes_family(test_user):
+    refresh_token = login().json()["refresh_token"]
+    rotated = client.post(
+        "/auth/refresh", json={"refresh_token": refresh_token}
+    ).json()["refresh_token"]
+
+    response = client.post("/auth/refresh", json={"refresh_token": refresh_token})
+    assert response.status_code == 401
+
+    response = client.post("/auth/refresh", json={"refresh_token": rotated})
+    assert response.status_code == 401
+
+
+def test_logout_revokes_refresh_token(test_user):
+    refresh_token = login().json()["refresh_token"]
+
+    response = client.post("/auth/logout", json={"refresh_token": refresh_token})
+    assert response.status_code == 204
+
+    response = client.post("/auth/refresh", json={"refresh_token": refresh_token})
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_get_current_user_rejects_refresh_token(test_user):
+    refresh_token = login().json()["refresh_token"]
+
+    with pytest.raises(HTTPException) as excinfo:
+        await get_current_user(token=refresh_token)
+
+    assert excinfo.value.status_code == 401
@@ -0,0 +1,259 @@
+import fnmatch
+import time
+from datetime import timedelta
+
+import pytest
+
+import cache as cache_module
+from cache import MemoryBackend, NullBackend, RedisBackend, TodoCache
+from rendering import STREAM_CHUNK_SIZE
+from routers.auth import create_access_token
+from routers.todos import get_db, get_current_user
+from fastapi import status
+
+from .utils import *
+
+app.dependency_overrides[get_db] = override_get_db
+
+app.dependency_overrides[get_current_user] = override_current_user
+
+
+class FakeRedis:
+    """Minimal stand-in for a redis.asyncio client."""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        value, expires_at = self.data.get(key, (None, None))
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.data[key]
+            return None
+        return value
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = (value, None if ex is None else time.monotonic() + ex)
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    async def incr(self, key):
+        value = int((await self.get(key)) or 0) + 1
+        self.data[key] = (str(value), None)
+        return value
+
+    async def scan_iter(self, match):
+        for key in list(self.data):
+            if fnmatch.fnmatch(key, match):
+                yield key
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "backend", [MemoryBackend(), RedisBackend(FakeRedis())], ids=["memory", "redis"]
+)
+async def test_todo_cache_invalidation(backend):
+    cache = TodoCache(backend, ttl=30)
+    await cache.set_list(await cache.list_key(1, {"limit": 10}), {"items": []})
+    await cache.set_todo(1, 5, {"id": 5})
+    await cache.set_list(await cache.list_key(2, {"limit": 10}), {"items": [{"id": 9}]})
+
+    assert await cache.get_list(await cache.list_key(1, {"limit": 10})) == {"items": []}
+    assert await cache.get_todo(1, 5) == {"id": 5}
+
+    await cache.invalidate(1, 5)
+
+    assert await cache.get_list(await cache.list_key(1, {"limit": 10})) is None
+    assert await cache.get_todo(1, 5) is None
+    assert await cache.get_list(await cache.list_key(2, {"limit": 10})) is not None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "backend", [MemoryBackend(), RedisBackend(FakeRedis())], ids=["memory", "redis"]
+)
+async def test_todo_cache_drops_results_read_before_a_write(backend):
+    cache = TodoCache(backend, ttl=30)
+    key = await cache.list_key(1, {"limit": 10})
+    assert await cache.get_list(key) is None
+
+    # A write commits between the database read and the cache fill.
+    await cache.invalidate(1)
+    await cache.set_list(key, {"items": ["stale"]})
+
+    assert await cache.get_list(await cache.list_key(1, {"limit": 10})) is None
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_evicts_and_expires():
+    backend = MemoryBackend(max_entries=2)
+    await backend.set("a", 1, ttl=30)
+    await backend.set("b", 2, ttl=30)
+    await backend.get("a")
+    await backend.set("c", 3, ttl=30)
+
+    assert await backend.get("b") is None
+    assert await backend.get("a") == 1
+
+    await backend.set("d", 4, ttl=0)
+    assert await backend.get("d") is None
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_drops_idle_generation_counters(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    backend = MemoryBackend()
+    cache = TodoCache(backend, ttl=30)
+    for owner_id in range(100):
+        await cache.invalidate(owner_id)
+
+    now[0] = 29.0
+    await cache.set_list(await cache.list_key(1, {}), {"items": ["current"]})
+    now[0] = 31.0
+    await cache.invalidate(1000)
+    assert len(backend._counters) == 1
+
+    # Owner 1 starts a new counter; the entry above must not come back.
+    await cache.invalidate(1)
+    assert await cache.get_list(await cache.list_key(1, {})) is None
+
+
+@pytest.mark.asyncio
+async def test_null_backend_never_hits():
+    cache = TodoCache(NullBackend())
+    await cache.set_todo(1, 1, {"id": 1})
+    assert await cache.get_todo(1, 1) is None
+
+
+def test_read_all_served_from_cache_until_write(test_todo):
+    assert len(client.get("/todos").json()) == 1
+
+    db = TestingSessionLocal()
+    db.add(
+        Todos(
+            title="Written behind the cache",
+            description="Not visible yet",
+            priority=1,
+            complete=False,
+            owner_id=1,
+        )
+    )
+    db.commit()
+    assert len(client.get("/todos").json()) == 1
+
+    response = client.post(
+        "/todos/todo",
+        json={
+            "title": "Through the API",
+            "description": "Invalidates the list",
+            "priority": 1,
+            "complete": False,
+        },
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    assert len(client.get("/todos").json()) == 3
+
+
+def test_read_todo_invalidated_by_update(test_todo):
+    assert client.get("/todos/todo/1").json()["title"] == "Learn to code!"
+
+    response = client.put(
+        "/todos/todo/1",
+        json={
+            "title": "Changed title",
+            "description": "Changed description",
+            "priority": 2,
+            "complete": True,
+        },
+    )
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert client.get("/todos/todo/1").json()["title"] == "Changed title"
+
+
+def test_todo_page_fragment_invalidated_by_write(test_todo):
+    token = create_access_token("codingwithrobytest", 1, "admin", timedelta(minutes=5))
+    client.cookies.set("access_token", token)
+    try:
+        assert "Learn to code!" in client.get("/todos/todo-page").text
+
+        db = TestingSessionLocal()
+        db.add(
+            Todos(
+                title="Written behind the cache",
+                description="Not visible yet",
+                priority=1,
+                complete=False,
+                owner_id=1,
+            )
+        )
+        db.commit()
+        assert "Written behind the cache" not in client.get("/todos/todo-page").text
+
+        client.delete("/todos/todo/1")
+        page = client.get("/todos/todo-page").text
+        assert "Written behind the cache" in page
+        assert "Learn to code!" not in page
+    finally:
+        client.cookies.clear()
+
+
+async def body_chunks(path, cookie):
+    """Body messages of a GET as the app sends them; TestClient joins them."""
+    chunks = []
+    requested = asyncio.Event()
+
+    async def receive():
+        if requested.is_set():
+            await asyncio.Event().wait()  # the client never disconnects
+        requested.set()
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.body" and message.get("body"):
+            chunks.append(message["body"])
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "server": ("testserver", 80),
+        "client": ("testclient", 50000),
+        "root_path": "",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "headers": [(b"host", b"testserver"), (b"cookie", cookie.encode())],
+    }
+    await app(scope, receive, send)
+    return chunks
+
+
+def test_todo_page_streams_rows_on_a_miss(test_todo):
+    db = TestingSessionLocal()
+    db.add_all(
+        Todos(
+            title=f"Todo number {i}",
+            description="Something to do " * 4,
+            priority=1,
+            complete=False,
+            owner_id=1,
+        )
+        for i in range(300)
+    )
+    db.commit()
+    token = create_access_token("codingwithrobytest", 1, "admin", timedelta(minutes=5))
+
+    chunks = asyncio.run(body_chunks("/todos/todo-page", f"access_token={token}"))
+    # The rows arrive as they render, not as one fully rendered block.
+    assert len(b"".join(chunks)) > 4 * STREAM_CHUNK_SIZE
+    assert max(len(chunk) for chunk in chunks) < 2 * STREAM_CHUNK_SIZE
+
+    # Filled once the rows were rendered, and served as-is from then on.
+    key = asyncio.run(todo_cache.fragment_key(1, "todo-rows"))
+    assert "Todo number 299" in asyncio.run(todo_cache.get_fragment(key))
+    cached = asyncio.run(body_chunks("/todos/todo-page", f"access_token={token}"))
+    assert b"".join(cached) == b"".join(chunks)
@@ -0,0 +1,129 @@
+import gzip
+import zlib
+
+from prometheus_client import REGISTRY
+from starlette.responses import Response, StreamingResponse
+
+from compression import CompressionMiddleware, available_encoders
+from config import Settings
+from routers.todos import get_db, get_current_user
+
+from .utils import *
+
+app.dependency_overrides[get_db] = override_get_db
+
+app.dependency_overrides[get_current_user] = override_current_user
+
+BODY = b'{"title": "Learn to code!", "complete": false}, ' * 100
+
+
+def compressing_client(response, **kwargs):
+    async def inner(scope, receive, send):
+        await response(scope, receive, send)
+
+    middleware = CompressionMiddleware(
+        inner, config=Settings(COMPRESSION_ENCODINGS="gzip"), **kwargs
+    )
+    return TestClient(middleware)
+
+
+def saved_bytes():
+    return (
+        REGISTRY.get_sample_value(
+            "http_compression_saved_bytes_total", {"encoding": "gzip"}
+        )
+        or 0
+    )
+
+
+def test_large_response_gzipped():
+    before = saved_bytes()
+    client = compressing_client(Response(BODY, media_type="application/json"))
+    response = client.get("/", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) < len(BODY)
+    assert response.content == BODY
+    assert saved_bytes() > before
+
+
+@pytest.mark.parametrize(
+    "response, accept",
+    [
+        (Response(BODY, media_type="application/json"), "identity"),
+        (Response(b"{}", media_type="application/json"), "gzip"),
+        (Response(BODY, media_type="image/png"), "gzip"),
+        (Response(BODY, headers={"Content-Encoding": "br"}), "gzip"),
+    ],
+    ids=["not-accepted", "too-small", "excluded-type", "already-encoded"],
+)
+def test_response_left_alone(response, accept):
+    client = compressing_client(response)
+    response = client.get("/", headers={"Accept-Encoding": accept})
+    assert response.headers.get("content-encoding") in (None, "br")
+    assert "vary" not in response.headers
+
+
+@pytest.mark.asyncio
+async def test_streaming_response_compressed_per_chunk():
+    chunks = [b"a" * 2000, b"b" * 2000, b"c" * 2000]
+
+    async def generate():
+        for chunk in chunks:
+            yield chunk
+
+    middleware = CompressionMiddleware(
+        StreamingResponse(generate(), media_type="application/x-ndjson"),
+        config=Settings(COMPRESSION_ENCODINGS="gzip"),
+    )
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(b"accept-encoding", b"gzip")],
+    }
+    sent = []
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    await middleware(scope, receive, send)
+
+    start, *bodies = sent
+    headers = dict(start["headers"])
+    assert headers[b"content-encoding"] == b"gzip"
+    assert b"content-length" not in headers
+
+    # Every chunk is flushed, so it decodes as soon as it arrives.
+    decoder = zlib.decompressobj(zlib.MAX_WBITS | 16)
+    assert decoder.decompress(bodies[0]["body"]) == chunks[0]
+    assert gzip.decompress(b"".join(b["body"] for b in bodies)) == b"".join(chunks)
+
+
+def test_todo_list_compressed(test_todo):
+    db = TestingSessionLocal()
+    db.add_all(
+        Todos(
+            title=f"Todo number {i}",
+            description="Something to do",
+            priority=3,
+            complete=False,
+            owner_id=1,
+        )
+        for i in range(50)
+    )
+    db.commit()
+
+    response = client.get("/todos", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert len(response.json()) == 51
+
+
+def test_available_encoders_follow_preference():
+    assert list(available_encoders(Settings(COMPRESSION_ENCODINGS="gzip"))) == ["gzip"]
+    with pytest.raises(ValueError):
+        available_encoders(Settings(COMPRESSION_ENCODINGS="lzma"))
@@ -0,0 +1,97 @@
+import json
+import logging
+import os
+
+import pytest
+
+from config import Settings
+from logging_config import (
+    LOG_RECORDS_DROPPED,
+    configure_logging,
+    parse_sample_rates,
+    request_id_ctx,
+    shutdown_logging,
+)
+
+
+@pytest.fixture
+def configure(tmp_path):
+    def configure_with(**overrides):
+        options = {"LOG_FILE": str(tmp_path / "app.log"), **overrides}
+        return configure_logging(Settings(**options))
+
+    yield configure_with
+    configure_logging()
+
+
+def read_lines(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_records_written_as_json_with_request_id(configure, tmp_path):
+    configure(LOG_BATCH_SIZE=10)
+    token = request_id_ctx.set("req-123")
+    try:
+        logging.getLogger("test").info("created todo %d", 7)
+    finally:
+        request_id_ctx.reset(token)
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logging.getLogger("test").exception("failed")
+    shutdown_logging()
+
+    first, second = read_lines(tmp_path / "app.log")
+    assert first["message"] == "created todo 7"
+    assert first["request_id"] == "req-123"
+    assert first["level"] == "INFO"
+    assert second["message"] == "failed"
+    assert "ValueError: boom" in second["exception"]
+
+
+def test_file_rotates_by_size(configure, tmp_path):
+    configure(LOG_BATCH_SIZE=1, LOG_FILE_MAX_BYTES=500, LOG_FILE_BACKUP_COUNT=2)
+    for i in range(30):
+        logging.getLogger("test").warning("line %d", i)
+    shutdown_logging()
+
+    assert (tmp_path / "app.log.1").exists()
+    assert (tmp_path / "app.log.2").exists()
+    assert not (tmp_path / "app.log.3").exists()
+
+
+def test_pid_placeholder_gives_each_process_its_own_file(configure, tmp_path):
+    configure(LOG_BATCH_SIZE=1, LOG_FILE=str(tmp_path / "app.{pid}.log"))
+    logging.getLogger("test").warning("from this worker")
+    shutdown_logging()
+
+    own_file = tmp_path / f"app.{os.getpid()}.log"
+    assert [r["message"] for r in read_lines(own_file)] == ["from this worker"]
+
+
+def test_sampling_drops_low_levels_only(configure, tmp_path):
+    configure(LOG_SAMPLE_RATES="INFO=0")
+    logging.getLogger("test").info("sampled out")
+    logging.getLogger("test").warning("kept")
+    shutdown_logging()
+
+    assert [r["message"] for r in read_lines(tmp_path / "app.log")] == ["kept"]
+
+
+def test_full_queue_drops_instead_of_blocking(configure):
+    listener = configure(LOG_QUEUE_SIZE=1)
+    listener.stop()  # nothing drains the queue now
+    dropped = LOG_RECORDS_DROPPED._value.get()
+    for i in range(3):
+        logging.getLogger("test").warning("line %d", i)
+    assert LOG_RECORDS_DROPPED._value.get() == dropped + 2
+    listener.queue.get_nowait()
+
+
+def test_parse_sample_rates():
+    assert parse_sample_rates("debug=0.01, INFO=0.5") == {
+        logging.DEBUG: 0.01,
+        logging.INFO: 0.5,
+    }
+    with pytest.raises(ValueError):
+        parse_sample_rates("LOUD=1")
@@ -9,3 +9,17 @@ def test_return_health_check():
     response = client.get("/healthy")
     assert response.status_code == status.HTTP_200_OK
     assert response.json() == {"status": "Healthy"}
+
+
+def test_lifespan_initializes_schema_once(monkeypatch):
+    import database
+
+    calls = []
+    monkeypatch.setattr(database, "_schema_ready", False)
+    monkeypatch.setattr(database, "create_schema", lambda: calls.append(True))
+
+    with TestClient(app) as lifespan_client:
+        assert lifespan_client.get("/health").status_code == status.HTTP_200_OK
+    database.init_db()
+
+    assert len(calls) == 1
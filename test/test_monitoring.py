@@ -0,0 +1,107 @@
+import logging
+import os
+import subprocess
+import sys
+
+from fastapi import status
+from prometheus_client import REGISTRY
+
+from monitoring import MonitoringMiddleware
+from routers.todos import get_db, get_current_user
+
+from .utils import *
+
+app.dependency_overrides[get_db] = override_get_db
+
+app.dependency_overrides[get_current_user] = override_current_user
+
+
+def request_count(endpoint, status_code):
+    return (
+        REGISTRY.get_sample_value(
+            "app_request_count_total",
+            {"method": "GET", "endpoint": endpoint, "status_code": str(status_code)},
+        )
+        or 0
+    )
+
+
+def test_metrics_labelled_by_route_template(test_todo):
+    template = "/todos/todo/{todo_id}"
+    found = request_count(template, 200)
+    missing = request_count(template, 404)
+
+    assert client.get("/todos/todo/1").status_code == status.HTTP_200_OK
+    assert client.get("/todos/todo/2").status_code == status.HTTP_404_NOT_FOUND
+
+    assert request_count(template, 200) == found + 1
+    assert request_count(template, 404) == missing + 1
+    assert request_count("/todos/todo/1", 200) == 0
+
+
+def test_unmatched_paths_share_one_label():
+    before = request_count("unmatched", 404)
+    client.get("/no-such-page-1")
+    client.get("/no-such-page-2")
+    assert request_count("unmatched", 404) == before + 2
+
+
+@pytest.mark.parametrize("sample_rate, logged", [(0.0, False), (1.0, True)])
+def test_access_log_sampling(caplog, sample_rate, logged):
+    async def ok_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    sampled_client = TestClient(MonitoringMiddleware(ok_app, sample_rate=sample_rate))
+    with caplog.at_level(logging.INFO, logger="monitoring"):
+        sampled_client.get("/sampled")
+    assert ("GET /sampled - Status: 200" in caplog.text) is logged
+
+
+@pytest.mark.parametrize("status_code", [404, 500])
+def test_access_log_sampling_keeps_errors(caplog, status_code):
+    async def failing_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": status_code, "headers": []})
+        await send({"type": "http.response.body", "body": b"error"})
+
+    sampled_client = TestClient(MonitoringMiddleware(failing_app, sample_rate=0.0))
+    with caplog.at_level(logging.INFO, logger="monitoring"):
+        sampled_client.get("/sampled")
+    assert f"GET /sampled - Status: {status_code}" in caplog.text
+
+
+MULTIPROCESS_SCRIPT = """
+import os
+from prometheus_client import Counter
+from monitoring import DB_POOL_CHECKED_OUT, metrics_endpoint
+
+WORKER_REQUESTS = Counter("test_worker_requests", "Requests served per worker")
+
+for _ in range(3):
+    pid = os.fork()
+    if pid == 0:
+        WORKER_REQUESTS.inc()
+        DB_POOL_CHECKED_OUT.labels(pool="test").set(2)
+        os._exit(0)
+    os.waitpid(pid, 0)
+
+print(metrics_endpoint().body.decode())
+"""
+
+
+def test_metrics_merged_across_worker_processes(tmp_path):
+    env = {
+        **os.environ,
+        "PROMETHEUS_MULTIPROC_DIR": str(tmp_path),
+        "DATABASE_URL": "sqlite:///./dev.db",
+    }
+    output = subprocess.run(
+        [sys.executable, "-c", MULTIPROCESS_SCRIPT],
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+
+    assert "test_worker_requests_total 3.0" in output
+    assert 'db_pool_checked_out{pool="test"} 6.0' in output
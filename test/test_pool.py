@@ -0,0 +1,71 @@
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+
+from config import settings
+from database import pool_options, to_async_url
+from monitoring import instrumented_pool_class
+
+
+def sample(name, pool):
+    return REGISTRY.get_sample_value(name, {"pool": pool}) or 0
+
+
+@pytest.mark.asyncio
+async def test_pool_metrics_track_checkouts(tmp_path):
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+        poolclass=instrumented_pool_class(AsyncAdaptedQueuePool, "test-queue"),
+        pool_size=1,
+        max_overflow=1,
+        pool_timeout=0.1,
+    )
+    waits = sample("db_pool_checkout_wait_seconds_count", "test-queue")
+
+    async with engine.connect() as first, engine.connect() as second:
+        await first.execute(text("select 1"))
+        await second.execute(text("select 1"))
+        assert sample("db_pool_checked_out", "test-queue") == 2
+        assert sample("db_pool_overflow", "test-queue") == 1
+        with pytest.raises(exc.TimeoutError):
+            await engine.connect().start()
+
+    assert sample("db_pool_checked_out", "test-queue") == 0
+    assert sample("db_pool_checkout_wait_seconds_count", "test-queue") == waits + 3
+    assert sample("db_pool_checkout_timeout_count_total", "test-queue") == 1
+    await engine.dispose()
+
+
+def test_null_pool_mode_disables_asyncpg_statement_cache(monkeypatch):
+    monkeypatch.setattr(settings, "DB_POOL_MODE", "null")
+    options = pool_options(to_async_url("postgresql://u:p@db/todos"), "test-null")
+
+    assert issubclass(options["poolclass"], NullPool)
+    assert "pool_size" not in options
+    assert options["connect_args"]["statement_cache_size"] == 0
+
+
+def test_queue_pool_mode_applies_sizing(monkeypatch):
+    monkeypatch.setattr(settings, "DB_POOL_MODE", "queue")
+    monkeypatch.setattr(settings, "DB_POOL_SIZE", 3)
+    monkeypatch.setattr(settings, "DB_MAX_OVERFLOW", 2)
+    options = pool_options(to_async_url("postgresql://u:p@db/todos"), "test-sized")
+
+    assert issubclass(options["poolclass"], AsyncAdaptedQueuePool)
+    assert (options["pool_size"], options["max_overflow"]) == (3, 2)
+    assert "connect_args" not in options
+
+
+@pytest.mark.parametrize(
+    "url", ["sqlite:///./pool-default.db", "sqlite://"], ids=["file", "memory"]
+)
+def test_queue_pool_mode_sizes_only_queue_pools(monkeypatch, url):
+    monkeypatch.setattr(settings, "DB_POOL_MODE", "queue")
+    async_url = to_async_url(url)
+    options = pool_options(async_url, "test-default")
+
+    assert ("pool_size" in options) == issubclass(options["poolclass"], QueuePool)
+    # The options must be accepted by whichever pool the dialect picked.
+    create_async_engine(async_url, **options).sync_engine.dispose()
@@ -0,0 +1,55 @@
+import logging
+
+from fastapi import status
+from prometheus_client import REGISTRY
+
+from config import settings
+from query_stats import QueryStats, report
+from routers.todos import get_db, get_current_user
+
+from .utils import *
+
+app.dependency_overrides[get_db] = override_get_db
+
+app.dependency_overrides[get_current_user] = override_current_user
+
+
+def sample(name, route):
+    return REGISTRY.get_sample_value(name, {"route": route}) or 0
+
+
+def test_request_records_queries_by_route_template(test_todo):
+    route = "/todos/todo/{todo_id}"
+    requests = sample("db_queries_per_request_count", route)
+    queries = sample("db_queries_per_request_sum", route)
+
+    response = client.get("/todos/todo/1")
+    assert response.status_code == status.HTTP_200_OK
+
+    assert sample("db_queries_per_request_count", route) == requests + 1
+    assert sample("db_queries_per_request_sum", route) == queries + 1
+    assert sample("db_time_per_request_seconds_count", route) >= 1
+
+
+def test_query_stats_tracks_slowest_statement():
+    stats = QueryStats()
+    stats.record("SELECT 1", 0.01)
+    stats.record("SELECT 2", 0.05)
+    stats.record("SELECT 1", 0.02)
+
+    assert stats.count == 3
+    assert stats.total_time == pytest.approx(0.08)
+    assert stats.slowest_statement == "SELECT 2"
+    assert stats.most_repeated() == ("SELECT 1", 2)
+
+
+def test_repeated_statement_logs_possible_n_plus_one(caplog, monkeypatch):
+    monkeypatch.setattr(settings, "SQL_REPEATED_STATEMENT_THRESHOLD", 3)
+    stats = QueryStats()
+    for _ in range(3):
+        stats.record("SELECT * FROM todos WHERE id = ?", 0.001)
+
+    with caplog.at_level(logging.WARNING, logger="query_stats"):
+        report(stats, "/test")
+
+    assert "Possible N+1 query on /test" in caplog.text
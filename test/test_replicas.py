@@ -0,0 +1,102 @@
+import os
+import time
+
+from fastapi import status
+
+import replicas
+from replicas import PRIMARY_PIN_COOKIE, ReplicaRouter
+from routers.todos import get_db, get_current_user
+
+from .utils import *
+
+app.dependency_overrides[get_db] = override_get_db
+
+app.dependency_overrides[get_current_user] = override_current_user
+
+REPLICA_PATH = "./testdb-replica.db"
+
+
+@pytest.fixture
+def replica(monkeypatch):
+    """A second SQLite file standing in for a lagging read replica."""
+    replica_engine = create_engine(f"sqlite:///{REPLICA_PATH}")
+    Base.metadata.create_all(bind=replica_engine)
+    with replica_engine.begin() as conn:
+        conn.execute(
+            Todos.__table__.insert().values(
+                id=1,
+                title="Replica copy",
+                description="Not replicated yet",
+                priority=5,
+                complete=False,
+                owner_id=1,
+            )
+        )
+    replica_engine.dispose()
+
+    async_replica = create_async_engine(
+        f"sqlite+aiosqlite:///{REPLICA_PATH}", poolclass=NullPool
+    )
+    monkeypatch.setattr(replicas, "replica_router", ReplicaRouter([async_replica]))
+    client.cookies.clear()
+    yield
+    client.cookies.clear()
+    asyncio.run(async_replica.dispose())
+    os.remove(REPLICA_PATH)
+
+
+def test_reads_go_to_replica(test_todo, replica):
+    response = client.get("/todos/todo/1")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["title"] == "Replica copy"
+
+    response = client.get("/todos")
+    assert [todo["title"] for todo in response.json()] == ["Replica copy"]
+
+
+def test_write_pins_client_to_primary(test_todo, replica):
+    request_data = {
+        "title": "Written to primary",
+        "description": "Updated Description",
+        "priority": 2,
+        "complete": True,
+    }
+    response = client.put("/todos/todo/1", json=request_data)
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert PRIMARY_PIN_COOKIE in response.cookies
+
+    response = client.get("/todos/todo/1")
+    assert response.json()["title"] == "Written to primary"
+
+
+def test_replica_reads_are_not_cached(test_todo, replica):
+    assert client.get("/todos/todo/1").json()["title"] == "Replica copy"
+    assert client.get("/todos").json()[0]["title"] == "Replica copy"
+
+    client.cookies.set(PRIMARY_PIN_COOKIE, str(time.time() + 60))
+    assert client.get("/todos/todo/1").json()["title"] == "Learn to code!"
+    assert client.get("/todos").json()[0]["title"] == "Learn to code!"
+
+
+def test_failed_write_does_not_pin(test_todo, replica):
+    response = client.delete("/todos/todo/999")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert PRIMARY_PIN_COOKIE not in response.cookies
+
+
+def test_reads_use_primary_without_replicas(test_todo):
+    response = client.get("/todos/todo/1")
+    assert response.json()["title"] == "Learn to code!"
+
+
+def test_round_robin_rotates_replicas():
+    router = ReplicaRouter(["a", "b", "c"])
+    assert [router.choose() for _ in range(4)] == [0, 1, 2, 0]
+
+
+def test_least_connections_prefers_idle_replica():
+    router = ReplicaRouter(["a", "b", "c"], strategy="least_connections")
+    router.in_flight = [2, 0, 1]
+    assert router.choose() == 1
+    router.in_flight = [1, 1, 1]
+    assert len({router.choose() for _ in range(3)}) == 3
@@ -0,0 +1,90 @@
+from fastapi import status
+
+from routers.todos import get_db, get_current_user
+import search as search_module
+from routers import todos as todos_router
+from search import search_terms
+
+from .utils import *
+
+app.dependency_overrides[get_db] = override_get_db
+
+app.dependency_overrides[get_current_user] = override_current_user
+
+
+def add_todos(*todos):
+    db = TestingSessionLocal()
+    db.add_all(
+        Todos(
+            title=title,
+            description=description,
+            priority=3,
+            complete=False,
+            owner_id=owner_id,
+        )
+        for title, description, owner_id in todos
+    )
+    db.commit()
+
+
+def search(q):
+    response = client.get("/todos/search", params={"q": q})
+    assert response.status_code == status.HTTP_200_OK
+    return [todo["title"] for todo in response.json()]
+
+
+def test_search_ranks_title_matches_first(test_todo):
+    add_todos(
+        ("Groceries", "Pick up a coding book", 1),
+        ("Code review", "Review the open pull requests", 1),
+    )
+    with assert_max_queries(async_engine, 1):
+        titles = search("cod")
+    assert titles[-1] == "Groceries"
+    assert set(titles) == {"Learn to code!", "Code review", "Groceries"}
+
+
+def test_search_matches_every_term_as_prefix(test_todo):
+    add_todos(("Code review", "Review the open pull requests", 1))
+    assert search("lear cod") == ["Learn to code!"]
+    assert search("everyday") == ["Learn to code!"]
+    assert search("nothing") == []
+
+
+def test_search_scoped_to_owner(test_todo):
+    add_todos(("Learn to cook", "Someone else's todo", 2))
+    assert search("learn") == ["Learn to code!"]
+
+
+def test_search_index_follows_writes(test_todo):
+    response = client.put(
+        "/todos/todo/1",
+        json={
+            "title": "Water the plants",
+            "description": "Every morning",
+            "priority": 2,
+            "complete": False,
+        },
+    )
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert search("learn") == []
+    assert search("plant") == ["Water the plants"]
+
+    client.delete("/todos/todo/1")
+    assert search("plant") == []
+
+
+def test_search_ignores_query_syntax(test_todo):
+    assert search('"learn*" (code) -- ;') == ["Learn to code!"]
+    assert search("***") == []
+    assert search_terms("Learn, to-code!") == ["learn", "to", "code"]
+
+
+def test_search_unsupported_database(test_todo, monkeypatch):
+    monkeypatch.setattr(
+        todos_router,
+        "search_todos",
+        lambda dialect, *args: search_module.search_todos("mysql", *args),
+    )
+    response = client.get("/todos/search", params={"q": "learn"})
+    assert response.status_code == status.HTTP_501_NOT_IMPLEMENTED
@@ -1,15 +1,22 @@
-from routers.todos import get_db, get_current_user
+from routers.todos import get_db, get_current_user, get_sessionmaker
 from fastapi import status
+import json
+
+from bulk_import import MAX_LINE_LENGTH, iter_lines
+from pagination import encode_cursor
 
 from .utils import *
 
 app.dependency_overrides[get_db] = override_get_db
 
+app.dependency_overrides[get_sessionmaker] = override_get_sessionmaker
+
 app.dependency_overrides[get_current_user] = override_current_user
 
 
 def test_read_all_authenticated(test_todo):
-    response = client.get("/todos")
+    with assert_max_queries(async_engine, 2):
+        response = client.get("/todos")
     assert response.status_code == status.HTTP_200_OK
 
     assert response.json() == [
@@ -25,7 +32,8 @@ def test_read_all_authenticated(test_todo):
 
 
 def test_read_one_authenticated(test_todo):
-    response = client.get("/todos/todo/1")
+    with assert_max_queries(async_engine, 1):
+        response = client.get("/todos/todo/1")
     assert response.status_code == status.HTTP_200_OK
 
     assert response.json() == {
@@ -72,7 +80,8 @@ def test_update_todo(test_todo):
         "complete": True,
     }
 
-    response = client.put("/todos/todo/1", json=request_data)
+    with assert_max_queries(async_engine, 2):
+        response = client.put("/todos/todo/1", json=request_data)
     assert response.status_code == status.HTTP_204_NO_CONTENT
 
     db = TestingSessionLocal()
@@ -111,3 +120,373 @@ def test_delete_todo_not_found(test_todo):
     response = client.delete("/todos/todo/999999")
     assert response.status_code == status.HTTP_404_NOT_FOUND
     assert response.json() == {"detail": "Todo not found."}
+
+
+def add_todos(count, owner_id=1):
+    db = TestingSessionLocal()
+    for i in range(count):
+        db.add(
+            Todos(
+                title=f"Todo {i}",
+                description="Paginated todo",
+                priority=i % 5 + 1,
+                complete=i % 2 == 0,
+                owner_id=owner_id,
+            )
+        )
+    db.commit()
+    db.close()
+
+
+def test_read_all_paginates_with_cursor(test_todo):
+    add_todos(4)
+
+    response = client.get("/todos", params={"limit": 2})
+    assert response.status_code == status.HTTP_200_OK
+    assert [todo["id"] for todo in response.json()] == [1, 2]
+    cursor = response.headers["X-Next-Cursor"]
+
+    response = client.get("/todos", params={"limit": 2, "cursor": cursor})
+    assert [todo["id"] for todo in response.json()] == [3, 4]
+    cursor = response.headers["X-Next-Cursor"]
+
+    response = client.get("/todos", params={"limit": 2, "cursor": cursor})
+    assert [todo["id"] for todo in response.json()] == [5]
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_read_all_filters_and_sorts(test_todo):
+    add_todos(4)
+
+    response = client.get(
+        "/todos",
+        params={"complete": "false", "priority_min": 2, "sort": "-priority"},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    todos = response.json()
+    assert all(todo["complete"] is False for todo in todos)
+    assert all(todo["priority"] >= 2 for todo in todos)
+    assert [todo["priority"] for todo in todos] == sorted(
+        [todo["priority"] for todo in todos], reverse=True
+    )
+
+    everything = client.get("/todos", params={"sort": "-priority"}).json()
+    first_page = client.get("/todos", params={"sort": "-priority", "limit": 2})
+    response = client.get(
+        "/todos",
+        params={
+            "sort": "-priority",
+            "limit": 10,
+            "cursor": first_page.headers["X-Next-Cursor"],
+        },
+    )
+    assert first_page.json() + response.json() == everything
+
+
+def test_read_all_pages_through_null_priorities(test_todo):
+    add_todos(3)
+    db = TestingSessionLocal()
+    db.query(Todos).filter(Todos.id.in_([2, 4])).update({Todos.priority: None})
+    db.commit()
+
+    for sort, expected in (
+        ("priority", [2, 4, 3, 1]),
+        ("-priority", [1, 3, 4, 2]),
+    ):
+        ids = []
+        params = {"sort": sort, "limit": 2}
+        while True:
+            response = client.get("/todos", params=params)
+            ids += [todo["id"] for todo in response.json()]
+            if "X-Next-Cursor" not in response.headers:
+                break
+            params["cursor"] = response.headers["X-Next-Cursor"]
+        assert ids == expected
+
+
+def test_read_all_invalid_cursor(test_todo):
+    response = client.get("/todos", params={"cursor": "not-a-cursor"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json() == {"detail": "Invalid cursor."}
+
+    for values in (["1"], [True], [1.5], [2**40]):
+        response = client.get("/todos", params={"cursor": encode_cursor("id", values)})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_batch_todos(test_todo):
+    add_todos(1)
+    request_data = {
+        "create": [
+            {
+                "title": "Batch one",
+                "description": "First batch todo",
+                "priority": 1,
+                "complete": False,
+            },
+            {
+                "title": "Batch two",
+                "description": "Second batch todo",
+                "priority": 2,
+                "complete": True,
+            },
+        ],
+        "update": [
+            {
+                "id": 1,
+                "title": "Updated in batch",
+                "description": "Updated description",
+                "priority": 3,
+                "complete": True,
+            },
+            {
+                "id": 999999,
+                "title": "Missing todo",
+                "description": "Does not exist",
+                "priority": 3,
+                "complete": True,
+            },
+        ],
+        "delete": [2, 999999],
+    }
+
+    # SQLite cannot order a multi-row INSERT RETURNING, so each create is
+    # its own INSERT here; Postgres batches them into one.
+    with assert_max_queries(async_engine, 5):
+        response = client.post("/todos/batch", json=request_data)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {
+        "create": [
+            {"index": 0, "id": 3, "status": 201},
+            {"index": 1, "id": 4, "status": 201},
+        ],
+        "update": [
+            {"index": 0, "id": 1, "status": 204},
+            {"index": 1, "id": 999999, "status": 404},
+        ],
+        "delete": [
+            {"index": 0, "id": 2, "status": 204},
+            {"index": 1, "id": 999999, "status": 404},
+        ],
+    }
+
+    db = TestingSessionLocal()
+    assert db.query(Todos).filter(Todos.id == 1).first().title == "Updated in batch"
+    assert db.query(Todos).filter(Todos.id == 2).first() is None
+    assert db.query(Todos).filter(Todos.id == 4).first().complete is True
+
+
+def test_export_todos_ndjson(test_todo):
+    add_todos(1, owner_id=2)
+
+    response = client.get("/todos/export")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line) for line in response.text.splitlines()] == [
+        {
+            "id": 1,
+            "title": "Learn to code!",
+            "description": "Need to learn everyday!",
+            "priority": 5,
+            "complete": False,
+            "owner_id": 1,
+        }
+    ]
+
+
+def test_export_todos_csv(test_todo):
+    response = client.get("/todos/export", params={"format": "csv"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.text.splitlines() == [
+        "id,title,description,priority,complete,owner_id",
+        "1,Learn to code!,Need to learn everyday!,5,False,1",
+    ]
+
+
+def test_import_todos_ndjson(test_todo):
+    body = "\n".join(
+        [
+            json.dumps(
+                {
+                    "title": "Imported",
+                    "description": "From NDJSON",
+                    "priority": 2,
+                    "complete": False,
+                }
+            ),
+            "{not json",
+            json.dumps(
+                {"title": "No", "description": "Too short", "priority": 9, "complete": 1}
+            ),
+            "",
+        ]
+    )
+
+    response = client.post(
+        "/todos/import",
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    report = response.json()
+    assert report["inserted"] == 1
+    assert report["failed"] == 2
+    assert [error["line"] for error in report["errors"]] == [2, 3]
+
+    db = TestingSessionLocal()
+    model_data = db.query(Todos).filter(Todos.id == 2).first()
+    assert model_data.title == "Imported"
+    assert model_data.owner_id == 1
+
+
+def test_import_todos_csv(test_todo):
+    body = (
+        "title,description,priority,complete\n"
+        'CSV todo,"Imported, with comma",3,true\n'
+        "Another,Second row,4,False\n"
+    )
+
+    response = client.post("/todos/import", params={"format": "csv"}, content=body)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"inserted": 2, "failed": 0, "errors": []}
+
+    db = TestingSessionLocal()
+    model_data = db.query(Todos).filter(Todos.id == 2).first()
+    assert model_data.description == "Imported, with comma"
+    assert model_data.complete is True
+
+
+def test_import_todos_csv_quoted_newline(test_todo):
+    body = (
+        "title,description,priority,complete\n"
+        'Multi-line,"First line\nsecond line",3,false\n'
+        "After,Still parsed,4,true\n"
+    )
+
+    response = client.post("/todos/import", params={"format": "csv"}, content=body)
+    assert response.json() == {"inserted": 2, "failed": 0, "errors": []}
+
+    db = TestingSessionLocal()
+    assert db.query(Todos).filter(Todos.id == 2).first().description == (
+        "First line\nsecond line"
+    )
+
+
+def test_import_todos_csv_with_bom(test_todo):
+    body = (
+        "\ufefftitle,description,priority,complete\n"
+        "From Excel,Starts with a BOM,3,false\n"
+    )
+
+    response = client.post("/todos/import", params={"format": "csv"}, content=body)
+    assert response.json() == {"inserted": 1, "failed": 0, "errors": []}
+
+    db = TestingSessionLocal()
+    assert db.query(Todos).filter(Todos.id == 2).first().title == "From Excel"
+
+
+def test_import_todos_failure_keeps_original_error(test_todo, monkeypatch):
+    import routers.todos as todos_router
+
+    async def failing_import(*args):
+        raise RuntimeError("import failed")
+
+    async def failing_bump(*args):
+        raise RuntimeError("bump failed")
+
+    monkeypatch.setattr(todos_router, "run_import", failing_import)
+    monkeypatch.setattr(todos_router, "bump_list_version", failing_bump)
+    with pytest.raises(RuntimeError, match="import failed"):
+        client.post(
+            "/todos/import", content="{}", headers={"Content-Type": "application/x-ndjson"}
+        )
+
+
+def test_import_todos_skips_overlong_line(test_todo):
+    record = {"title": "Imported", "description": "Fits", "priority": 2, "complete": False}
+    body = "\n".join(
+        [json.dumps(record), "x" * (MAX_LINE_LENGTH + 10), json.dumps(record), ""]
+    )
+
+    response = client.post(
+        "/todos/import",
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    report = response.json()
+    assert report["inserted"] == 2
+    assert report["errors"] == [
+        {"line": 2, "detail": f"Line longer than {MAX_LINE_LENGTH} characters."}
+    ]
+
+
+def test_iter_lines_skips_overlong_line_across_chunks():
+    async def body():
+        yield b"first\n" + b"x" * (MAX_LINE_LENGTH + 5)
+        yield b"y" * 10
+        yield b"z\nlast\n"
+
+    async def collect():
+        return [line async for line in iter_lines(body())]
+
+    assert asyncio.run(collect()) == ["first", None, "last"]
+
+
+def test_import_todos_unsupported_format(test_todo):
+    response = client.post(
+        "/todos/import", content="{}", headers={"Content-Type": "application/xml"}
+    )
+    assert response.status_code == status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+
+
+def test_read_todo_conditional_get(test_todo):
+    response = client.get("/todos/todo/1")
+    etag = response.headers["ETag"]
+
+    response = client.get("/todos/todo/1", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.headers["ETag"] == etag
+
+
+def test_read_all_conditional_get(test_user, test_todo):
+    response = client.get("/todos")
+    etag = response.headers["ETag"]
+
+    response = client.get("/todos", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    client.delete("/todos/todo/1")
+    response = client.get("/todos", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["ETag"] != etag
+
+
+def test_update_todo_if_match(test_todo):
+    request_data = {
+        "title": "Updated Todo!",
+        "description": "Updated Description",
+        "priority": 2,
+        "complete": True,
+    }
+    etag = client.get("/todos/todo/1").headers["ETag"]
+
+    response = client.put(
+        "/todos/todo/1", json=request_data, headers={"If-Match": etag}
+    )
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert response.headers["ETag"] != etag
+
+    response = client.put(
+        "/todos/todo/1", json=request_data, headers={"If-Match": etag}
+    )
+    assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+    assert response.json() == {"detail": "Todo has been modified."}
+
+
+def test_delete_todo_if_match_stale(test_todo):
+    response = client.delete("/todos/todo/1", headers={"If-Match": '"t-1-0"'})
+    assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+
+    db = TestingSessionLocal()
+    assert db.query(Todos).filter(Todos.id == 1).first() is not None
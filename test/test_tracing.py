@@ -0,0 +1,114 @@
+import pytest
+from fastapi.testclient import TestClient
+from opentelemetry.trace.propagation.tracecontext import TraceContextTextMapPropagator
+
+from config import Settings
+import tracing
+from tracing import (
+    PerProcessSpanExporter,
+    RequestLifecycleMiddleware,
+    build_tracer_provider,
+    redact,
+)
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+
+async def echo_app(scope, receive, send):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            break
+    status_code = 500 if scope["path"] == "/fail" else 200
+    await send({"type": "http.response.start", "status": status_code, "headers": []})
+    await send({"type": "http.response.body", "body": body})
+
+
+def traced_client(**overrides):
+    config = Settings(TRACING_EXPORTER="memory", **overrides)
+    exporter = InMemorySpanExporter()
+    provider = build_tracer_provider(exporter, config=config)
+    middleware = RequestLifecycleMiddleware(
+        echo_app,
+        tracer_provider=provider,
+        body_max_bytes=config.TRACING_BODY_MAX_BYTES,
+    )
+    return TestClient(middleware), exporter
+
+
+def test_body_captured_capped_and_redacted():
+    client, exporter = traced_client(TRACING_BODY_MAX_BYTES=40)
+    body = b'{"password": "hunter2", "title": "' + b"x" * 100 + b'"}'
+    response = client.post("/todos", content=body)
+    assert response.content == body  # the app still sees the whole body
+
+    (span,) = exporter.get_finished_spans()
+    captured = span.attributes["http.request_body"]
+    assert "hunter2" not in captured
+    assert '"password": [REDACTED]' in captured
+    assert not captured.endswith("\"}")
+    assert span.attributes["http.request_body_size"] == len(body)
+    assert span.attributes["http.request_body_truncated"] is True
+
+
+def test_head_sampling_drops_unsampled_requests():
+    client, exporter = traced_client(TRACING_SAMPLE_RATIO=0.0)
+    client.post("/todos", content=b"{}")
+    assert exporter.get_finished_spans() == ()
+
+
+def test_remote_sampled_parent_is_followed():
+    config = Settings(TRACING_SAMPLE_RATIO=0.0)
+    exporter = InMemorySpanExporter()
+    tracer = build_tracer_provider(exporter, config=config).get_tracer(__name__)
+    parent = TraceContextTextMapPropagator().extract(
+        {"traceparent": "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"}
+    )
+    with tracer.start_as_current_span("child", context=parent):
+        pass
+    assert len(exporter.get_finished_spans()) == 1
+
+
+@pytest.mark.parametrize(
+    "path, slow_seconds, kept",
+    [("/ok", 60.0, False), ("/fail", 60.0, True), ("/ok", 0.0, True)],
+)
+def test_tail_sampling_keeps_slow_or_failed(path, slow_seconds, kept):
+    client, exporter = traced_client(
+        TRACING_SAMPLE_RATIO=0.0,
+        TRACING_TAIL_SAMPLING=True,
+        TRACING_SLOW_REQUEST_SECONDS=slow_seconds,
+    )
+    client.get(path)
+    spans = exporter.get_finished_spans()
+    assert len(spans) == (1 if kept else 0)
+    if kept:
+        assert spans[0].context.trace_flags.sampled
+
+
+def test_redact_form_and_json_fields():
+    assert redact("username=bob&password=s3cret") == "username=bob&password=[REDACTED]"
+    assert (
+        redact('{"access_token": "a b", "title": "ok"}')
+        == '{"access_token": [REDACTED], "title": "ok"}'
+    )
+
+
+def test_exporter_rebuilt_in_each_process(monkeypatch):
+    built = []
+
+    def factory():
+        built.append(InMemorySpanExporter())
+        return built[-1]
+
+    exporter = PerProcessSpanExporter(factory)
+    assert built == []  # nothing is connected until spans are exported
+
+    exporter.export([])
+    exporter.export([])
+    assert len(built) == 1
+
+    monkeypatch.setattr(tracing.os, "getpid", lambda: -1)  # a forked worker
+    exporter.export([])
+    assert len(built) == 2
@@ -1,6 +1,8 @@
 from .utils import *
 from routers.users import get_db, get_current_user
 from fastapi import status
+from models import Users
+from passwords import password_hasher
 
 app.dependency_overrides[get_db] = override_get_db
 
@@ -26,6 +28,45 @@ def test_change_password_success(test_user):
     assert response.status_code == status.HTTP_204_NO_CONTENT
 
 
+def test_change_password_revokes_refresh_tokens(test_user):
+    refresh_token = client.post(
+        "/auth/token",
+        data={"username": "codingwithrobytest", "password": "testpassword"},
+    ).json()["refresh_token"]
+
+    response = client.put(
+        "/user/password",
+        json={"password": "testpassword", "new_password": "newtestpassword"},
+    )
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+
+    response = client.post("/auth/refresh", json={"refresh_token": refresh_token})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_change_password_loses_concurrent_change(test_user, monkeypatch):
+    verify = password_hasher.verify
+
+    async def verify_then_change_elsewhere(password, hashed_password):
+        db = TestingSessionLocal()
+        db.query(Users).filter(Users.id == 1).update(
+            {Users.hashed_password: bcrypt_context.hash("changedelsewhere")}
+        )
+        db.commit()
+        return await verify(password, hashed_password)
+
+    monkeypatch.setattr(password_hasher, "verify", verify_then_change_elsewhere)
+    response = client.put(
+        "/user/password",
+        json={"password": "testpassword", "new_password": "newtestpassword"},
+    )
+    assert response.status_code == status.HTTP_409_CONFLICT
+
+    db = TestingSessionLocal()
+    user = db.query(Users).filter(Users.id == 1).first()
+    assert bcrypt_context.verify("changedelsewhere", user.hashed_password)
+
+
 def test_change_password_invalid_current_password(test_user):
     response = client.put(
         "/user/password",
@@ -38,3 +79,18 @@ def test_change_password_invalid_current_password(test_user):
 def test_change_phone_number_success(test_user):
     response = client.put("/user/phonenumber/222222222")
     assert response.status_code == status.HTTP_204_NO_CONTENT
+
+    db = TestingSessionLocal()
+    assert db.query(Users).filter(Users.id == 1).first().phone_number == "222222222"
+
+
+def test_change_phone_number_user_not_found():
+    response = client.put("/user/phonenumber/222222222")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert response.json() == {"detail": "User not found."}
+
+
+def test_return_user_omits_password_hash(test_user):
+    response = client.get("/user")
+    assert response.status_code == status.HTTP_200_OK
+    assert "hashed_password" not in response.json()
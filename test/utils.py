@@ -1,14 +1,22 @@
 from sqlalchemy import create_engine, text
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool, StaticPool
 from sqlalchemy.orm import sessionmaker
 from models import Todos, Users
 from database import Base
 from main import app
 from fastapi.testclient import TestClient
+import asyncio
+from contextlib import contextmanager
 import pytest
+from sqlalchemy import event
+from cache import todo_cache
 from routers.auth import bcrypt_context
+from query_stats import instrument_engine
+from search import install_search_index
 
 SQLALCHEMY_DATABASE_URI = "sqlite:///./testdb.db"
+ASYNC_SQLALCHEMY_DATABASE_URI = "sqlite+aiosqlite:///./testdb.db"
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URI,
@@ -18,16 +26,28 @@ engine = create_engine(
 
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# The TestClient runs each request on its own event loop, so connections are
+# never shared between loops.
+async_engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URI, poolclass=NullPool)
+
+TestingAsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
+instrument_engine(async_engine)
+
 
 Base.metadata.create_all(bind=engine)
+with engine.begin() as connection:
+    install_search_index(connection)
 
 
-def override_get_db():
-    db = TestingSessionLocal()
-    try:
+async def override_get_db():
+    async with TestingAsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+
+def override_get_sessionmaker():
+    return TestingAsyncSessionLocal
 
 
 def override_current_user():
@@ -37,6 +57,37 @@ def override_current_user():
 client = TestClient(app)
 
 
+@contextmanager
+def assert_max_queries(engine, limit: int):
+    """Fail if more than ``limit`` SQL statements run on ``engine`` in the block.
+
+    Yields the list of executed statements for further assertions.
+    """
+    statements = []
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(sync_engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", record)
+    assert len(statements) <= limit, (
+        f"{len(statements)} queries executed, expected at most {limit}:\n"
+        + "\n".join(statements)
+    )
+
+
+@pytest.fixture(autouse=True)
+def clear_todo_cache():
+    # Fixtures write straight to the database, bypassing cache invalidation.
+    asyncio.run(todo_cache.clear())
+    yield
+    asyncio.run(todo_cache.clear())
+
+
 @pytest.fixture
 def test_todo():
     todo = Todos(
@@ -73,5 +124,6 @@ def test_user():
     db.commit()
     yield user
     with engine.connect() as conn:
+        conn.execute(text("DELETE FROM refresh_tokens;"))
         conn.execute(text("DELETE FROM users;"))
         conn.commit()
@@ -0,0 +1,75 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from prometheus_client import Counter
+
+from config import settings
+
+TOKEN_CACHE_HITS = Counter(
+    "auth_token_cache_hit_count",
+    "Access tokens whose verified claims were served from the cache",
+)
+
+TOKEN_CACHE_MISSES = Counter(
+    "auth_token_cache_miss_count",
+    "Access tokens that needed a full signature verification",
+)
+
+
+class VerifiedTokenCache:
+    """Bounded LRU of verified JWT claims keyed by a SHA-256 of the token.
+
+    Entries never outlive the token's ``exp`` claim, and are additionally
+    capped at ``max_ttl`` seconds so tokens without ``exp`` are re-verified
+    regularly.
+    """
+
+    def __init__(self, max_entries=10000, max_ttl=300, clock=time.time):
+        self.max_entries = max_entries
+        self.max_ttl = max_ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str):
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                claims, expires_at = entry
+                if expires_at > self.clock():
+                    self._entries.move_to_end(key)
+                    TOKEN_CACHE_HITS.inc()
+                    return claims
+                del self._entries[key]
+        TOKEN_CACHE_MISSES.inc()
+        return None
+
+    def put(self, token: str, claims: dict, exp=None):
+        expires_at = self.clock() + self.max_ttl
+        if exp is not None:
+            expires_at = min(expires_at, float(exp))
+        if self.max_entries <= 0 or expires_at <= self.clock():
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (claims, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = VerifiedTokenCache(
+    max_entries=settings.TOKEN_CACHE_MAX_ENTRIES,
+    max_ttl=settings.TOKEN_CACHE_MAX_TTL_SECONDS,
+)
@@ -1,111 +1,372 @@
 from opentelemetry import trace
-from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import BatchSpanProcessor
+from opentelemetry.sdk.trace import SpanProcessor, ReadableSpan, TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    SimpleSpanProcessor,
+    SpanExporter,
+)
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.sdk.trace.sampling import (
+    Decision,
+    ParentBased,
+    Sampler,
+    SamplingResult,
+    TraceIdRatioBased,
+)
 from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
 from opentelemetry.sdk.resources import Resource
+from opentelemetry.trace import SpanContext, TraceFlags
 from opentelemetry.trace.status import Status, StatusCode
-from contextvars import ContextVar
-from fastapi import Request
+from starlette.datastructures import URL
 import logging
+import os
+import re
+import threading
 import time
-import json
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+from config import settings
+from logging_config import request_id_ctx
+
 logger = logging.getLogger(__name__)
 
-# Context variable to store request ID
-request_id_ctx = ContextVar("request_id", default=None)
+BODY_METHODS = frozenset({"POST", "PUT", "PATCH"})
+
+# "password": "...", password=..., access_token: ... (JSON, form or text)
+SENSITIVE_FIELD = re.compile(
+    r"""(?ix)
+    ( ["']? [\w-]* (?:password|secret|token|api[_-]?key|authorization) [\w-]* ["']?
+      \s* [:=] \s* )
+    ( "(?:[^"\\]|\\.)*"? | [^&,}\s]* )
+    """
+)
+
+
+def redact(text: str) -> str:
+    """Mask the values of password/secret/token fields in a request body."""
+    return SENSITIVE_FIELD.sub(r"\1[REDACTED]", text)
+
+
+class RecordOnlyBelowRatio(TraceIdRatioBased):
+    """Root sampler for tail sampling: traces outside the ratio are still
+    recorded (but not marked sampled) so a slow or failed one can be kept."""
+
+    def should_sample(self, parent_context, trace_id, name, kind=None,
+                      attributes=None, links=None, trace_state=None):
+        result = super().should_sample(
+            parent_context, trace_id, name, kind, attributes, links, trace_state
+        )
+        if result.decision is Decision.DROP:
+            return SamplingResult(Decision.RECORD_ONLY, attributes, result.trace_state)
+        return result
+
+    def get_description(self):
+        return f"RecordOnlyBelowRatio{{{self.rate}}}"
+
+
+class RecordIfParentRecords(Sampler):
+    """Children of a recorded-only span are recorded too; children of a
+    dropped span stay dropped."""
+
+    def should_sample(self, parent_context, trace_id, name, kind=None,
+                      attributes=None, links=None, trace_state=None):
+        parent = trace.get_current_span(parent_context)
+        if parent.is_recording():
+            return SamplingResult(
+                Decision.RECORD_ONLY,
+                attributes,
+                parent.get_span_context().trace_state,
+            )
+        return SamplingResult(Decision.DROP)
+
+    def get_description(self):
+        return "RecordIfParentRecords"
+
+
+def build_sampler(config=settings):
+    """Head sampler: follow the caller's decision when a parent was
+    propagated, otherwise sample TRACING_SAMPLE_RATIO of new traces."""
+    if config.TRACING_TAIL_SAMPLING:
+        return ParentBased(
+            root=RecordOnlyBelowRatio(config.TRACING_SAMPLE_RATIO),
+            local_parent_not_sampled=RecordIfParentRecords(),
+        )
+    return ParentBased(root=TraceIdRatioBased(config.TRACING_SAMPLE_RATIO))
+
+
+class TailSamplingSpanProcessor(SpanProcessor):
+    """Passes head-sampled spans straight to ``processor``.
+
+    Spans of traces that were only recorded are held until the trace's local
+    root span ends, then forwarded only if the root took at least
+    ``slow_seconds`` or any of the spans failed. At most ``max_pending_traces``
+    traces are held at once; spans of further traces are discarded.
+    """
+
+    def __init__(self, processor: SpanProcessor, slow_seconds: float,
+                 max_pending_traces: int = 1000):
+        self.processor = processor
+        self.slow_ns = int(slow_seconds * 1e9)
+        self.max_pending_traces = max_pending_traces
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def on_start(self, span, parent_context=None):
+        self.processor.on_start(span, parent_context=parent_context)
+
+    def on_end(self, span: ReadableSpan):
+        if span.context.trace_flags.sampled:
+            self.processor.on_end(span)
+            return
+
+        trace_id = span.context.trace_id
+        is_local_root = span.parent is None or span.parent.is_remote
+        with self._lock:
+            if is_local_root:
+                spans = self._pending.pop(trace_id, [])
+            elif trace_id in self._pending:
+                self._pending[trace_id].append(span)
+                return
+            elif len(self._pending) < self.max_pending_traces:
+                self._pending[trace_id] = [span]
+                return
+            else:
+                return
+        spans.append(span)
+
+        failed = any(s.status.status_code is StatusCode.ERROR for s in spans)
+        if failed or span.end_time - span.start_time >= self.slow_ns:
+            for kept in spans:
+                self.processor.on_end(as_sampled(kept))
+
+    def shutdown(self):
+        self.processor.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self.processor.force_flush(timeout_millis)
+
+
+def as_sampled(span: ReadableSpan) -> ReadableSpan:
+    """Copy of ``span`` flagged as sampled, so exporting processors accept it."""
+    context = span.context
+    return ReadableSpan(
+        name=span.name,
+        context=SpanContext(
+            context.trace_id,
+            context.span_id,
+            is_remote=context.is_remote,
+            trace_flags=TraceFlags(TraceFlags.SAMPLED),
+            trace_state=context.trace_state,
+        ),
+        parent=span.parent,
+        resource=span.resource,
+        attributes=span.attributes,
+        events=span.events,
+        links=span.links,
+        kind=span.kind,
+        status=span.status,
+        start_time=span.start_time,
+        end_time=span.end_time,
+        instrumentation_scope=span.instrumentation_scope,
+    )
+
+
+class PerProcessSpanExporter(SpanExporter):
+    """Exporter built by ``factory`` on first use in each process.
+
+    gRPC channels are not fork-safe, so the OTLP exporter must not be created
+    in a preloaded gunicorn master and inherited by its workers; this way
+    the master, which serves no requests, never opens one. The
+    BatchSpanProcessor in front restarts its own thread after a fork.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._exporter = None
+        self._pid = None
+
+    def _current(self):
+        if self._pid != os.getpid():
+            self._exporter = self._factory()
+            self._pid = os.getpid()
+        return self._exporter
+
+    def export(self, spans):
+        return self._current().export(spans)
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        if self._pid != os.getpid():
+            return True
+        return self._exporter.force_flush(timeout_millis)
+
+    def shutdown(self):
+        if self._pid == os.getpid():
+            self._exporter.shutdown()
+
+
+def build_exporter(config=settings):
+    """Span exporter named by TRACING_EXPORTER (otlp | memory)."""
+    if config.TRACING_EXPORTER == "memory":
+        return InMemorySpanExporter()
+    if config.TRACING_EXPORTER == "otlp":
+        return PerProcessSpanExporter(
+            lambda: OTLPSpanExporter(
+                endpoint=config.TRACING_OTLP_ENDPOINT,
+                insecure=config.TRACING_OTLP_INSECURE,
+            )
+        )
+    raise ValueError(f"Unknown tracing exporter '{config.TRACING_EXPORTER}'.")
+
+
+def build_tracer_provider(exporter, service_name="fastapi-todo-app", config=settings):
+    """TracerProvider with the configured samplers feeding ``exporter``.
+
+    The in-memory exporter is fed synchronously so tests can read spans as
+    soon as a request finishes; other exporters go through a bounded
+    BatchSpanProcessor that drops spans rather than grow without limit.
+    """
+    if isinstance(exporter, InMemorySpanExporter):
+        processor = SimpleSpanProcessor(exporter)
+    else:
+        processor = BatchSpanProcessor(
+            exporter,
+            max_queue_size=config.TRACING_MAX_QUEUE_SIZE,
+            max_export_batch_size=config.TRACING_MAX_EXPORT_BATCH_SIZE,
+            schedule_delay_millis=config.TRACING_SCHEDULE_DELAY_MILLIS,
+            export_timeout_millis=config.TRACING_EXPORT_TIMEOUT_MILLIS,
+        )
+    if config.TRACING_TAIL_SAMPLING:
+        processor = TailSamplingSpanProcessor(
+            processor, config.TRACING_SLOW_REQUEST_SECONDS
+        )
 
-def setup_tracing(app, service_name="fastapi-todo-app"):
-    """Setup OpenTelemetry tracing with OTLP exporter"""
-    
-    # Create a TracerProvider
     provider = TracerProvider(
+        sampler=build_sampler(config),
         resource=Resource.create({
             "service.name": service_name,
             "service.namespace": "todo-app",
             "service.version": "1.0.0"
         })
     )
-    
-    # Create and add OTLP exporter
-    otlp_exporter = OTLPSpanExporter(
-        endpoint="http://tempo:4317",  # Tempo OTLP gRPC endpoint
-        insecure=True
-    )
-    provider.add_span_processor(BatchSpanProcessor(otlp_exporter))
-    
+    provider.add_span_processor(processor)
+    return provider
+
+
+def setup_tracing(app, service_name="fastapi-todo-app", config=settings):
+    """Setup OpenTelemetry tracing and return the span exporter"""
+
+    exporter = build_exporter(config)
+    provider = build_tracer_provider(exporter, service_name, config)
+
     # Set the TracerProvider
     trace.set_tracer_provider(provider)
-    
+
+    # Request lifecycle span, inside the server span FastAPIInstrumentor opens
+    app.add_middleware(
+        RequestLifecycleMiddleware,
+        tracer_provider=provider,
+        body_max_bytes=config.TRACING_BODY_MAX_BYTES,
+    )
+
     # Instrument FastAPI
-    FastAPIInstrumentor.instrument_app(app)
-
-async def request_lifecycle_middleware(request: Request, call_next):
-    """Middleware to log request lifecycle events"""
-    
-    # Get current tracer
-    tracer = trace.get_tracer(__name__)
-    
-    with tracer.start_as_current_span("http_request") as span:
-        start_time = time.time()
-        
-        # Extract request details
-        method = request.method
-        url = str(request.url)
-        client_host = request.client.host if request.client else "unknown"
-        
-        # Add request details to span
-        span.set_attribute("http.method", method)
-        span.set_attribute("http.url", url)
-        span.set_attribute("http.client_ip", client_host)
-        
-        # Log request start
-        logger.info(f"Request started: {method} {url} from {client_host}")
-        
-        try:
-            # Get request body if available
-            if request.method in ["POST", "PUT", "PATCH"]:
-                body = await request.body()
+    FastAPIInstrumentor.instrument_app(app, tracer_provider=provider)
+    return exporter
+
+
+class RequestLifecycleMiddleware:
+    """Pure ASGI middleware wrapping each request in an ``http_request`` span.
+
+    Requests the sampler drops cost one non-recording span and nothing else.
+    For recorded requests, up to ``body_max_bytes`` of a POST/PUT/PATCH body
+    are copied as the app reads it, with secret fields redacted, instead of
+    buffering the whole body up front.
+    """
+
+    def __init__(self, app, tracer_provider=None, body_max_bytes: int | None = None):
+        self.app = app
+        self.tracer = trace.get_tracer(__name__, tracer_provider=tracer_provider)
+        if body_max_bytes is None:
+            body_max_bytes = settings.TRACING_BODY_MAX_BYTES
+        self.body_max_bytes = body_max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with self.tracer.start_as_current_span(
+            "http_request", record_exception=False, set_status_on_exception=False
+        ) as span:
+            if not span.is_recording():
+                await self.app(scope, receive, send)
+                return
+
+            start_time = time.perf_counter()
+            method = scope["method"]
+            url = str(URL(scope=scope))
+            client = scope.get("client")
+            span.set_attribute("http.method", method)
+            span.set_attribute("http.url", url)
+            span.set_attribute("http.client_ip", client[0] if client else "unknown")
+            request_id = request_id_ctx.get()
+            if request_id is not None:
+                span.set_attribute("http.request_id", request_id)
+
+            body = bytearray()
+            body_size = 0
+            status_code = 500
+
+            async def receive_with_capture():
+                nonlocal body_size
+                message = await receive()
+                if message["type"] == "http.request":
+                    chunk = message.get("body", b"")
+                    body_size += len(chunk)
+                    room = self.body_max_bytes - len(body)
+                    if room > 0:
+                        body.extend(chunk[:room])
+                return message
+
+            async def send_with_status(message):
+                nonlocal status_code
+                if message["type"] == "http.response.start":
+                    status_code = message["status"]
+                await send(message)
+
+            capture = self.body_max_bytes > 0 and method in BODY_METHODS
+            try:
+                await self.app(
+                    scope,
+                    receive_with_capture if capture else receive,
+                    send_with_status,
+                )
+            except Exception as e:
+                logger.error("Request failed: %s %s - Error: %s", method, url, e)
+                span.set_status(Status(StatusCode.ERROR))
+                span.record_exception(e)
+                raise
+            else:
+                duration = time.perf_counter() - start_time
+                span.set_attribute("http.status_code", status_code)
+                span.set_attribute("http.duration", duration)
+                if status_code >= 500:
+                    span.set_status(Status(StatusCode.ERROR))
+                logger.debug(
+                    "Request completed: %s %s - Status: %d - Duration: %.3fs",
+                    method, url, status_code, duration
+                )
+            finally:
                 if body:
-                    try:
-                        body_str = body.decode()
-                        span.set_attribute("http.request_body", body_str)
-                        logger.info(f"Request body: {body_str}")
-                    except:
-                        pass
-            
-            # Process request
-            response = await call_next(request)
-            
-            # Calculate duration
-            duration = time.time() - start_time
-            
-            # Add response details to span
-            span.set_attribute("http.status_code", response.status_code)
-            span.set_attribute("http.duration", duration)
-            
-            # Log response
-            logger.info(
-                f"Request completed: {method} {url} - "
-                f"Status: {response.status_code} - "
-                f"Duration: {duration:.3f}s"
-            )
-            
-            return response
-            
-        except Exception as e:
-            # Log error and add to span
-            error_msg = str(e)
-            logger.error(f"Request failed: {method} {url} - Error: {error_msg}")
-            
-            span.set_status(Status(StatusCode.ERROR))
-            span.record_exception(e)
-            
-            raise
+                    span.set_attribute(
+                        "http.request_body",
+                        redact(body.decode("utf-8", errors="replace")),
+                    )
+                    span.set_attribute("http.request_body_size", body_size)
+                    span.set_attribute(
+                        "http.request_body_truncated", body_size > len(body)
+                    )
+
 
 def get_request_id():
     """Get the current request ID"""
-    return request_id_ctx.get() 
\ No newline at end of file
+    return request_id_ctx.get()